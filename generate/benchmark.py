@@ -0,0 +1,688 @@
+#!/usr/bin/env python
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""offline benchmarks of generator hot paths
+
+python benchmark.py [size_mb]       micro benchmarks
+python benchmark.py suite [scale]   stages on a synthetic config, small/medium/large
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import filecmp
+import platform
+import tempfile
+import tracemalloc
+import contextlib
+from datetime import datetime
+import util
+
+BENCH_SPLIT_MB = int(os.environ.get("EZTF_BENCH_SPLIT_MB") or 50)
+BENCH_REFS = int(os.environ.get("EZTF_BENCH_REFS") or 10000)
+BENCH_SCALE = os.environ.get("EZTF_BENCH_SCALE") or "small"
+BENCH_OUTPUT_DIR = (
+    os.environ.get("EZTF_BENCH_OUTPUT_DIR") or "../ezytf-gen-data/eztf-bench"
+)
+
+# ranges most of generation time goes to, results without them are not comparable
+BENCH_CORE_RANGES = ["folders", "users", "groups", "projects", "vpcs"]
+BENCH_SCALES = {
+    "small": {
+        "projects": 20,
+        "users": 50,
+        "groups": 10,
+        "vpcs": 2,
+        "subnets": 10,
+        "folder_depth": 2,
+        "iam_roles": 5,
+        "any_resources": 20,
+    },
+    "medium": {
+        "projects": 200,
+        "users": 500,
+        "groups": 100,
+        "vpcs": 10,
+        "subnets": 50,
+        "folder_depth": 3,
+        "iam_roles": 10,
+        "any_resources": 200,
+    },
+    "large": {
+        "projects": 1000,
+        "users": 2000,
+        "groups": 400,
+        "vpcs": 40,
+        "subnets": 100,
+        "folder_depth": 4,
+        "iam_roles": 20,
+        "any_resources": 2000,
+    },
+}
+
+sentinel = object()
+
+
+def regex_split_tf_file(input_file, output_folder):
+    "previous whole file regex splitter, kept as reference for comparison"
+    os.makedirs(output_folder, exist_ok=True)
+    with open(input_file, "r", encoding="utf-8") as f:
+        content = f.read()
+    tf_content = re.sub(r"\"\$\{(.+)\}\"", "\\1", content)
+    pattern = rf"variable\s+\"{util.RANDOM_WORD}(file_.*?)\"\s+\{{\s*\}}"
+    tf_list = re.split(pattern, tf_content)
+
+    filename = "backend"
+    j = 0
+    for tfdata in tf_list:
+        if match := re.search(r"^file_(\S+)$", tfdata):
+            filename = match.group(1)
+            continue
+        j += 1
+        filename = filename or f"file_{j}"
+        with open(
+            os.path.join(output_folder, f"{filename}.tf"), "w", encoding="utf-8"
+        ) as f:
+            f.write(tfdata)
+        filename = ""
+
+
+def synthetic_stack(tf_file, size_mb):
+    "writes a synthesized like hcl stack of about size_mb with separator variables"
+    target = size_mb * 1024 * 1024
+    with open(tf_file, "w", encoding="utf-8") as f:
+        f.write('terraform {\n  backend "gcs" {\n    bucket = "bench"\n  }\n}\n\n')
+        size, n = 0, 0
+        while size < target:
+            block = f'variable "{util.RANDOM_WORD}file_stack_{n}" {{\n\n}}\n'
+            for i in range(200):
+                block += (
+                    f'module "subnet_{n}_{i}" {{\n'
+                    f'  source = "terraform-google-modules/network/google//modules/subnets"\n'
+                    f'  project_id = "${{module.project_{n}.project_id}}"\n'
+                    f'  network_name = "${{module.vpc_{n}.network_name}}"\n'
+                    f'  description = "subnet {i} of ${{var.env}}"\n'
+                    f"  subnets = [\n    {{\n"
+                    f'      subnet_ip = "10.{n % 256}.{i}.0/24"\n'
+                    f'      subnet_name = "subnet-{n}-{i}"\n'
+                    f'      subnet_region = "us-central1"\n'
+                    f"    }}\n  ]\n}}\n\n"
+                )
+            f.write(block)
+            size += len(block)
+            n += 1
+
+
+def measure(func, *args):
+    "returns seconds taken and peak traced memory in MB, from separate runs"
+    with open(os.devnull, "w", encoding="utf-8") as devnull:
+        with contextlib.redirect_stdout(devnull):
+            start = time.perf_counter()
+            func(*args)
+            seconds = time.perf_counter() - start
+            # tracing slows python code down, so memory is taken from a second run
+            tracemalloc.start()
+            func(*args)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+    return seconds, peak / 1024 / 1024
+
+
+def same_output(folder_a, folder_b):
+    files = sorted(os.listdir(folder_a))
+    if files != sorted(os.listdir(folder_b)):
+        return False
+    _, mismatch, errors = filecmp.cmpfiles(folder_a, folder_b, files, shallow=False)
+    return not mismatch and not errors
+
+
+def bench_split_tf(size_mb=BENCH_SPLIT_MB):
+    "compares streaming split_tf_file with the previous regex splitter"
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tf_file = os.path.join(tmp_dir, "cdk.tf")
+        synthetic_stack(tf_file, size_mb)
+        results = {"size_mb": round(os.path.getsize(tf_file) / 1024 / 1024, 1)}
+        for name, func in [
+            ("regex", regex_split_tf_file),
+            ("streaming", util.split_tf_file),
+        ]:
+            seconds, peak_mb = measure(func, tf_file, os.path.join(tmp_dir, name))
+            results[name] = {"seconds": round(seconds, 2), "peak_mb": round(peak_mb, 1)}
+        results["same_output"] = same_output(
+            os.path.join(tmp_dir, "regex"), os.path.join(tmp_dir, "streaming")
+        )
+    return results
+
+
+# fmt: off
+def chain_tf_ref(self, res_type, name, default=sentinel):
+    "previous if/elif MyStack.tf_ref, kept as reference for comparison"
+    if default is sentinel:
+        default = name
+    refname = default
+    if (res_type == "billing" or res_type == "billing_account") and not name:
+        self.ensure_variables(["billing_id"])
+        refname = self.created["vars"]["billing_id"].string_value
+    if res_type == "customer_id" and not name:
+        if self.created.get("data", {}).get("google_org"):
+            refname = self.created["data"]["google_org"].directory_customer_id
+        else:
+            self.ensure_variables(["customer_id"])
+            refname = self.created["vars"]["customer_id"].string_value
+    if res_type == "user" and self.created.get("users", {}).get(name):
+        refname = self.created["users"][name].primary_email
+    if res_type == "group" and self.created.get("groups", {}).get(name):
+        refname = self.created["groups"][name].id_output
+    if res_type == "group_name" and self.created.get("groups", {}).get(name):
+        refname = self.created["groups"][name].name_output
+    if (res_type == "service_account" or res_type == "serviceaccount") and self.created.get("service_account", {}).get(name):
+        refname = self.created["service_account"][name].email
+    elif res_type == "network" and self.created.get("network", {}).get(name):
+        refname = self.created["network"][name].network_self_link_output
+    elif res_type == "network_name" and self.created.get("network", {}).get(name):
+        refname = self.created["network"][name].network_name_output
+    elif res_type == "network_id" and self.created.get("network", {}).get(name):
+        refname = self.created["network"][name].network_id_output
+    elif res_type == "project" and self.created.get("projects", {}).get(name):
+        refname = self.created["projects"][name].project_id_output
+    elif res_type == "project_number" and self.created.get("projects", {}).get(name):
+        refname = self.created["projects"][name].project_number_output
+    elif res_type == "projects/number" and self.created.get("projects", {}).get(name):
+        refname = f'projects/{self.created["projects"][name].project_number_output}'
+    elif res_type == "organization":
+        self.ensure_variables(["organization_id"])
+        refname = self.created["vars"]["organization_id"].string_value
+    elif res_type == "folder" and self.created.get("folders", {}).get(name):
+        refname = self.created["folders"][name].name
+    elif res_type == "folder_id" and self.created.get("folders", {}).get(name):
+        refname = self.created["folders"][name].folder_id
+    elif res_type == "subnet":
+        prj, region, subnet = self._re_prj_region_subnet(name)
+        region_subnet = f"{region}/{subnet}"
+        if vpc_name := self.added.get("subnets", {}).get(region_subnet):
+            refname = f'${{module.nw_{vpc_name}.subnets["{region_subnet}"].self_link}}'
+        elif region and subnet:
+            prj = prj or '${var.nw_project_id}'
+            refname = f"projects/{prj}/regions/{region}/subnetworks/{subnet}"
+    elif res_type == "vpn_ha" and name in self.added.get("vpn_ha", set()):
+        refname = f"${{module.vpn_ha_{name}.self_link}}"
+    elif res_type == "external_vpn_gateway" and self.created.get("external_vpn_gateway", {}).get(name):
+        refname = self.created["external_vpn_gateway"][name].self_link
+    elif res_type == "sc_policy" and self.created.get("sc_policy", {}).get(name):
+        refname = self.created["sc_policy"][name].name
+    elif res_type == "sc_access_level_name" and self.created.get("sc_access_level", {}).get(name):
+        refname = self.created["sc_access_level"][name].name_output
+    elif res_type == "custom_org_policy" and self.created.get("custom_org_policy", {}).get(name):
+        refname = self.created["custom_org_policy"][name].name
+    elif res_type == "log_destination" and self.created.get(res_type, {}).get(name):
+        refname = self.created[res_type][name].destination_uri_output
+    if res_type == "vm_template" and self.created.get("vm_template", {}).get(name):
+        refname = self.created["vm_template"][name].self_link_unique_output
+    if res_type == "disk" and self.created.get("disk", {}).get(name):
+        refname = self.created["disk"][name].self_link
+    if res_type == "bq_dataset" and self.created.get("bq_dataset", {}).get(name):
+        refname = self.created["bq_dataset"][name].dataset_id
+    if res_type == "bq_table" and self.created.get("bq_table", {}).get(name):
+        refname = self.created["bq_table"][name].table_id
+    if res_type == "bq_routine" and self.created.get("bq_routine", {}).get(name):
+        refname = self.created["bq_routine"][name].routine_id
+    if res_type == "wif_pool" and self.created.get("wif_pool", {}).get(name):
+        refname = self.created["wif_pool"][name].workforce_pool_id
+    if res_type == "wi_pool" and self.created.get("wi_pool", {}).get(name):
+        refname = self.created["wi_pool"][name].workload_identity_pool_id
+    if res_type == "cx" and self.created.get("cx", {}).get(name):
+        refname = self.created["cx"][name].id
+    if res_type == "datastore" and self.created.get("datastore", {}).get(name):
+        refname = self.created["datastore"][name].data_store_id
+    if res_type == "ai_index" and self.created.get("ai_index", {}).get(name):
+        refname = self.created["ai_index"][name].id
+    if res_type == "ai_index_endpoint" and self.created.get("ai_index_endpoint", {}).get(name):
+        refname = self.created["ai_index_endpoint"][name].id
+    return refname
+# fmt: on
+
+
+class RefOutput:
+    "stand in for a created construct, outputs are plain strings"
+
+    def __init__(self, path):
+        self._path = path
+
+    def __getattr__(self, attribute):
+        return f"${{{self._path}.{attribute}}}"
+
+
+class RefStack:
+    """stand in stack with n created resources of every referred type,
+    so tf_ref dispatch is measured without the jsii runtime"""
+
+    def __init__(self, n):
+        from resources import MyStack
+
+        self._re_prj_region_subnet = MyStack._re_prj_region_subnet.__get__(self)
+        self.tf_ref = MyStack.tf_ref.__get__(self)
+        self.index_subnet = MyStack.index_subnet.__get__(self)
+        self.created = {"vars": {}, "data": {}}
+        for created_type in [
+            "projects",
+            "network",
+            "service_account",
+            "users",
+            "groups",
+            "folders",
+            "bq_dataset",
+            "ai_index_endpoint",
+        ]:
+            self.created[created_type] = {
+                f"{created_type}-{i}": RefOutput(f"{created_type}.{i}")
+                for i in range(n)
+            }
+        # previous subnet map read by chain_tf_ref, and the network index
+        self.added = {
+            "subnets": {f"us-central1/subnet-{i}": f"network-{i}" for i in range(n)},
+            "vpn_ha": {f"vpn-{i}" for i in range(n)},
+        }
+        for i in range(n):
+            region_subnet = f"us-central1/subnet-{i}"
+            self.index_subnet(
+                "prj",
+                "us-central1",
+                f"subnet-{i}",
+                f'${{module.nw_network-{i}.subnets["{region_subnet}"].self_link}}',
+            )
+
+    def ensure_variables(self, variables):
+        for variable in variables:
+            self.created["vars"].setdefault(variable, RefOutput(f"var.{variable}"))
+
+
+def stack_refs(refs_count, n=100):
+    "returns refs_count tf_ref arguments, resources across types and misses"
+    ref_types = [
+        ("project", "projects"),
+        ("project_number", "projects"),
+        ("projects/number", "projects"),
+        ("network", "network"),
+        ("service_account", "service_account"),
+        ("user", "users"),
+        ("group", "groups"),
+        ("folder_id", "folders"),
+        ("bq_dataset", "bq_dataset"),
+        ("ai_index_endpoint", "ai_index_endpoint"),
+    ]
+    refs = []
+    for i in range(refs_count):
+        res_type, created_type = ref_types[i % len(ref_types)]
+        # every fifth reference is not created in the stack
+        suffix = i % n if i % 5 else f"missing-{i}"
+        refs.append((res_type, f"{created_type}-{suffix}"))
+        if i % 10 == 0:
+            refs.append(("subnet", f"prj/us-central1/subnet-{i % (n * 2)}"))
+            refs.append(("organization", "/"))
+    return refs[:refs_count]
+
+
+def subnet_refs(refs_count, n=100):
+    "returns refs_count subnet tf_ref arguments in the forms vm nics use"
+    forms = [
+        "projects/prj/regions/us-central1/subnetworks/subnet-{}",
+        "prj/us-central1/subnet-{}",
+        "us-central1/subnet-{}",
+        "other-prj/us-central1/subnet-{}",
+    ]
+    return [
+        ("subnet", forms[i % len(forms)].format(i % (n * 2)))
+        for i in range(refs_count)
+    ]
+
+
+def bench_tf_ref(refs_count=BENCH_REFS, repeat=20, ref_func=stack_refs):
+    "compares table driven tf_ref with the previous if/elif chain"
+    stack = RefStack(100)
+    refs = ref_func(refs_count)
+    results = {"refs": len(refs)}
+    for name, func in [
+        ("chain", chain_tf_ref.__get__(stack)),
+        ("table", stack.tf_ref),
+    ]:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for res_type, ref in refs:
+                func(res_type, ref)
+        seconds = (time.perf_counter() - start) / repeat
+        results[name] = {"ms": round(seconds * 1000, 2)}
+    results["same_output"] = [chain_tf_ref(stack, *ref) for ref in refs] == [
+        stack.tf_ref(*ref) for ref in refs
+    ]
+    return results
+
+
+def folder_tree(depth, fanout=3, prefix=""):
+    "returns nested folder config of given depth"
+    if depth == 0:
+        return {}
+    return {
+        f"{prefix}f{i}": folder_tree(depth - 1, fanout, f"{prefix}f{i}-")
+        for i in range(fanout)
+    }
+
+
+def folder_paths(tree, parent=""):
+    "returns /a/b paths of every folder of a folder tree"
+    paths = []
+    for name, sub_tree in tree.items():
+        path = f"{parent}/{name}"
+        paths.append(path)
+        paths.extend(folder_paths(sub_tree, path))
+    return paths
+
+
+def synthetic_config(
+    projects=20,
+    users=50,
+    groups=10,
+    vpcs=2,
+    subnets=10,
+    folder_depth=2,
+    iam_roles=5,
+    any_resources=20,
+):
+    """returns eztf config of given scale, as read_input produces from a sheet,
+    with org, identity, projects, network, resources and files stacks"""
+    domain = "example.com"
+    regions = ["us-central1", "europe-west1", "asia-south1"]
+    roles = [f"roles/bench.role{i}" for i in range(iam_roles)]
+    folders = folder_tree(folder_depth)
+    paths = folder_paths(folders)
+    project_ids = [f"prj-{i}" for i in range(projects)]
+    user_emails = [f"user{i}@{domain}" for i in range(users)]
+    group_ids = [f"grp-{i}@{domain}" for i in range(groups)]
+    principals = [f"user:{email}" for email in user_emails] + [
+        f"group:{group_id}" for group_id in group_ids
+    ]
+
+    def node_iam(i):
+        # five principals of the matrix per node, each with every role
+        return {
+            principals[(i + j) % len(principals)]: roles
+            for j in range(min(5, len(principals)))
+        }
+
+    return {
+        "variable": {
+            "domain": domain,
+            "organization_id": "123456789",
+            "billing_id": "AAAAAA-BBBBBB-CCCCCC",
+            "project_suffix": "-bench",
+            "setup_project_id": "setup-prj",
+            "setup_gcs": "setup-bucket",
+        },
+        "eztf": {
+            "stacks": {
+                "org": [{"folders": "folders"}, {"org_iam": "iam"}],
+                "identity": [{"users": "users"}, {"groups": "groups"}],
+                "projects": [
+                    {"projects": "projects"},
+                    {"sas": "service_account"},
+                    {"prj_iam": "iam"},
+                    {"settings": "tf_vars"},
+                ],
+                "network": [{"vpcs": "network"}],
+                "resources": [{"buckets": "res"}],
+                "files": [{"manifests": "yaml"}, {"docs": "anyfile"}],
+            },
+            "tf_any_resource": {"buckets": {"name": "google_storage_bucket"}},
+        },
+        "folders": folders,
+        "org_iam": {node: node_iam(i) for i, node in enumerate(["/"] + paths)},
+        "users": [
+            {
+                "primary_email": email,
+                "name": {"given_name": "User", "family_name": str(i)},
+            }
+            for i, email in enumerate(user_emails)
+        ],
+        "groups": [
+            {
+                "id": group_id,
+                "display_name": group_id.split("@")[0],
+                "owners": [user_emails[i % users]] if users else [],
+                "members": [
+                    user_emails[(i + j) % users] for j in range(min(10, users))
+                ],
+            }
+            for i, group_id in enumerate(group_ids)
+        ],
+        "projects": [
+            {
+                "name": project_id,
+                "folder_id": paths[i % len(paths)] if paths else "/",
+                "activate_apis": ["compute.googleapis.com", "storage.googleapis.com"],
+            }
+            for i, project_id in enumerate(project_ids)
+        ],
+        "sas": [
+            {"account_id": f"sa-{i}", "project": project_id}
+            for i, project_id in enumerate(project_ids)
+        ],
+        "prj_iam": {
+            project_id: node_iam(i) for i, project_id in enumerate(project_ids)
+        },
+        "settings": {
+            "project_labels": {
+                project_id: {"env": ["dev", "prod"][i % 2], "cost_center": f"cc-{i}"}
+                for i, project_id in enumerate(project_ids)
+            },
+        },
+        "vpcs": [
+            {
+                "network_name": f"vpc-{k}",
+                "project_id": project_ids[k % projects] if projects else "net-prj",
+                "subnets": [
+                    {
+                        "subnet_name": f"sn-{k}-{s}",
+                        "subnet_ip": f"10.{k % 256}.{s % 256}.0/24",
+                        "subnet_region": regions[s % len(regions)],
+                    }
+                    for s in range(subnets)
+                ],
+            }
+            for k in range(vpcs)
+        ],
+        "buckets": [
+            {
+                "_eztf_resource_id": f"b{i}",
+                "name": f"bench-bucket-{i}",
+                "location": "US",
+                "project": project_ids[i % projects] if projects else "prj",
+                "labels": {"index": str(i)},
+            }
+            for i in range(any_resources)
+        ],
+        "manifests": [
+            {"kind": "Namespace", "metadata": {"name": project_id}}
+            for project_id in project_ids
+        ],
+        "docs": [
+            {
+                "eztf_filename": f"docs/{project_id}.md",
+                "content": "# {{ name }}\n\nowner {{ owner }}\n",
+                "name": project_id,
+                "owner": user_emails[i % users] if users else "",
+            }
+            for i, project_id in enumerate(project_ids)
+        ],
+    }
+
+
+def timed(func, *args):
+    "returns result and seconds taken, output of func is dropped"
+    with open(os.devnull, "w", encoding="utf-8") as devnull:
+        with contextlib.redirect_stdout(devnull):
+            start = time.perf_counter()
+            result = func(*args)
+            seconds = time.perf_counter() - start
+    return result, round(seconds, 3)
+
+
+def skip_unavailable(config):
+    """imports generator modules of the config, drops ranges whose generator
+    can not be imported, e.g. without `cdktf get` modules. returns skipped ranges"""
+    import importlib
+    from resources import creation, load_generators
+
+    stacks = config["eztf"]["stacks"]
+    resource_types = sorted(
+        {
+            resource
+            for range_resources in stacks.values()
+            for range_resource in range_resources
+            for resource in range_resource.values()
+            if resource in creation
+        }
+    )
+    failed = load_generators(resource_types)
+    importlib.import_module("cdktf_cdktf_provider_google.provider")
+    skipped = []
+    for stack_name, range_resources in stacks.items():
+        available = []
+        for range_resource in range_resources:
+            if any(
+                resource in creation and creation[resource].module_name in failed
+                for resource in range_resource.values()
+            ):
+                skipped.extend(range_resource)
+            else:
+                available.append(range_resource)
+        stacks[stack_name] = available
+    return skipped
+
+
+def constructed_ranges(split_files):
+    """returns ranges whose split tf file has blocks, split_files are
+    file paths split_tf_file wrote"""
+    ranges = set()
+    for tf_file in split_files:
+        with open(tf_file, encoding="utf-8") as fp:
+            if fp.read().strip():
+                ranges.add(os.path.splitext(os.path.basename(tf_file))[0])
+    return sorted(ranges)
+
+
+def bench_suite(**scale):
+    """times generation stages on a synthetic config of given scale,
+    config load, generator imports, MyStack construction, synth, split_tf_file,
+    tf_vars_file and repo.my_creator. results are not valid when a core range
+    was not constructed, e.g. its generator module is not available"""
+    from cdktf import App, TerraformStack
+    import main
+    import repo
+    import pipeline
+
+    results = {
+        "scale": scale,
+        "time": datetime.now().strftime("%Y-%m-%d_%H-%M-%S"),
+        "python": platform.python_version(),
+        "stages": {},
+    }
+    stages = results["stages"]
+    with tempfile.TemporaryDirectory(prefix="eztf-bench-") as tmp_dir:
+        config_file = os.path.join(tmp_dir, "config.yaml")
+        util.write_file_yaml(config_file, synthetic_config(**scale))
+        results["config_mb"] = round(os.path.getsize(config_file) / 1024 / 1024, 2)
+
+        config, stages["config_load"] = timed(pipeline.load_config, config_file)
+        results["skipped_ranges"], stages["load_generators"] = timed(
+            skip_unavailable, config
+        )
+        config["eztf"]["tf_stacks"] = main.tf_stacks(config["eztf"]["stacks"])
+
+        app = App(outdir=os.path.join(tmp_dir, "cdktf.out"))
+        config, stages["construct"] = timed(main.run_cdktf, config, app)
+        results["constructs"] = sum(
+            len(stack.node.find_all())
+            for stack in app.node.children
+            if TerraformStack.is_stack(stack)
+        )
+        stacks_hcl, stages["synth"] = timed(main.synth_hcl, app)
+        results["hcl_mb"] = round(
+            sum(len(hcl) for hcl in stacks_hcl.values()) / 1024 / 1024, 2
+        )
+
+        # split reads the files cdktf synth writes
+        hcl_files = {}
+        for stack_name, hcl in stacks_hcl.items():
+            hcl_files[stack_name] = os.path.join(tmp_dir, "hcl", f"{stack_name}.tf")
+            util.write_file_any(hcl_files[stack_name], hcl)
+        output_folder = os.path.join(tmp_dir, "output")
+        split_files, stages["split_tf_file"] = timed(
+            lambda: [
+                os.path.join(output_folder, stack_name, split_file)
+                for stack_name, tf_file in hcl_files.items()
+                for split_file in util.split_tf_file(
+                    tf_file, os.path.join(output_folder, stack_name)
+                )
+            ]
+        )
+        results["tf_ranges"] = constructed_ranges(split_files)
+        results["missing_ranges"] = [
+            range_name
+            for range_name in BENCH_CORE_RANGES
+            if range_name not in results["tf_ranges"]
+        ]
+        results["valid"] = not results["missing_ranges"]
+        tf_vars = config["eztf"].get("tf_vars", {})
+        _, stages["tf_vars_file"] = timed(
+            lambda: [
+                util.tf_vars_file(stack_vars, os.path.join(output_folder, stack_name))
+                for stack_name, stack_vars in tf_vars.items()
+                if stack_vars
+            ]
+        )
+        _, stages["my_creator"] = timed(repo.my_creator, output_folder, config)
+    return results
+
+
+def write_results(results, name):
+    """stores results as json, named by scale and time so runs can be compared,
+    an existing file of the same second is kept"""
+    output_name = f"{name}-{results['time']}"
+    output_file = os.path.join(BENCH_OUTPUT_DIR, f"{output_name}.json")
+    run = 1
+    while os.path.exists(output_file):
+        run += 1
+        output_file = os.path.join(BENCH_OUTPUT_DIR, f"{output_name}-{run}.json")
+    util.write_file_json(output_file, results)
+    return output_file
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "suite":
+        scale_name = sys.argv[2] if len(sys.argv) > 2 else BENCH_SCALE
+        results = bench_suite(**BENCH_SCALES[scale_name])
+        print(json.dumps(results, indent=2))
+        if not results["valid"]:
+            sys.exit(
+                f"results not written, ranges not constructed: "
+                f"{','.join(results['missing_ranges'])}"
+            )
+        print(f"results written to {write_results(results, scale_name)}")
+        sys.exit()
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else BENCH_SPLIT_MB
+    print(f"split_tf_file: {bench_split_tf(size)}")
+    print(f"tf_ref: {bench_tf_ref()}")
+    print(f"tf_ref subnet: {bench_tf_ref(ref_func=subnet_refs)}")
@@ -0,0 +1,66 @@
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import pytest
+import util
+import benchmark
+
+
+class TestBenchmark:
+
+    def test_synthetic_config(self):
+        config = benchmark.synthetic_config(
+            projects=4, users=6, groups=2, vpcs=2, subnets=3, folder_depth=2
+        )
+        assert len(benchmark.folder_paths(config["folders"])) == 3 + 9
+        assert len(config["projects"]) == len(config["prj_iam"]) == 4
+        assert len(config["vpcs"][1]["subnets"]) == 3
+        assert config["groups"][0]["members"][0] == "user0@example.com"
+        for stack_name in config["eztf"]["stacks"]:
+            ranges, _ = util.stack_ranges(config, stack_name)
+            assert ranges, stack_name
+
+    def test_bench_suite(self, monkeypatch):
+        pytest.importorskip("cdktf")
+        # templates are read relative to the generate folder
+        monkeypatch.chdir(os.path.dirname(os.path.abspath(__file__)))
+        results = benchmark.bench_suite(
+            projects=2, users=2, groups=1, vpcs=1, subnets=1, folder_depth=1
+        )
+        assert list(results["stages"]) == [
+            "config_load",
+            "load_generators",
+            "construct",
+            "synth",
+            "split_tf_file",
+            "tf_vars_file",
+            "my_creator",
+        ]
+        assert results["constructs"] > 0 and results["hcl_mb"] > 0
+        assert results["valid"] == (not results["missing_ranges"])
+        # skipped generators leave their ranges out, the result is not valid
+        assert set(results["skipped_ranges"]) <= set(results["missing_ranges"])
+        if results["skipped_ranges"]:
+            pytest.skip(f"generators not available: {results['skipped_ranges']}")
+        assert set(benchmark.BENCH_CORE_RANGES) <= set(results["tf_ranges"])
+        assert results["valid"]
+
+    def test_write_results(self, monkeypatch, tmp_path):
+        monkeypatch.setattr(benchmark, "BENCH_OUTPUT_DIR", str(tmp_path))
+        results = {"time": "2024-05-01_10-00-00", "stages": {}}
+        first = benchmark.write_results(results, "small")
+        second = benchmark.write_results(results, "small")
+        assert os.path.basename(first) == "small-2024-05-01_10-00-00.json"
+        assert os.path.basename(second) == "small-2024-05-01_10-00-00-2.json"
@@ -15,20 +15,45 @@
 
 import os
 import copy
+import time
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 import yaml
-from cdktf import App
+from cdktf import App, Aspects, TerraformStack
 import util
+import profiling
 from resources import MyStack, creation
 
-app = App()
+# node metadata type of Annotations.add_error, the jsii enum value is its name
+ERROR_ANNOTATION = "@cdktf/error"
 
 
-def run_cdktf(config):
-    """run cdktf stack"""
+def stack_config(config, sub_stack):
+    """returns part of config read by a sub stack, its ranges and variable
+    are deep copied as generators modify them, eztf details are shared"""
+    ranges, details = util.stack_ranges(config, sub_stack)
+    eztf_config = copy.deepcopy(ranges)
+    eztf_config["variable"] = copy.deepcopy(config.get("variable", {}))
+    if "customer_id" in config:
+        eztf_config["customer_id"] = config["customer_id"]
+    eztf_config["eztf"] = {
+        "stacks": {sub_stack: config["eztf"]["stacks"][sub_stack]},
+        **details,
+    }
+    return eztf_config
+
+
+def run_cdktf(config, app, sub_stacks=None):
+    """run cdktf stack, limited to sub_stacks when provided,
+    construct seconds are added to eztf stack_seconds by stack name"""
     config["eztf"]["tf_vars"] = config["eztf"].get("tf_vars", {})
+    stack_seconds = config["eztf"].setdefault("stack_seconds", {})
     domain = config["variable"]["domain"]
     config_stack = config["eztf"]["stacks"]
     tfstacks = set(config["eztf"].get("tf_stacks", []))
+    if sub_stacks is not None:
+        tfstacks &= set(sub_stacks)
 
     for sub_stack, range_resources in config_stack.items():
         if sub_stack not in tfstacks:
@@ -37,13 +62,117 @@ def run_cdktf(config):
             sub_stack, {}
         )
         stack_name = f"gcp-{util.clean_res_id(domain)}-{sub_stack}"
-        eztf_config = copy.deepcopy(config)
-        app_stack = MyStack(app, stack_name, eztf_config, sub_stack, range_resources)
+        eztf_config = stack_config(config, sub_stack)
+        start = time.perf_counter()
+        with profiling.phase("stack", stack=sub_stack) as record:
+            app_stack = MyStack(
+                app, stack_name, eztf_config, sub_stack, range_resources
+            )
+        stack_seconds[stack_name] = (
+            stack_seconds.get(stack_name, 0) + time.perf_counter() - start
+        )
+        profiling.count_constructs(record, app_stack)
         config["eztf"]["tf_vars"][sub_stack] = app_stack.tf_vars
 
     return config
 
 
+def synth_stack(config, sub_stack, range_resources):
+    """synthesize a single sub stack in its own App, returns sub stack name,
+    tf_vars, hcl content by stack name and construct and synth seconds"""
+    domain = config["variable"]["domain"]
+    stack_name = f"gcp-{util.clean_res_id(domain)}-{sub_stack}"
+    start = time.perf_counter()
+    with tempfile.TemporaryDirectory(prefix="cdktf-") as outdir:
+        app = App(outdir=outdir)
+        app_stack = MyStack(app, stack_name, config, sub_stack, range_resources)
+        stacks_hcl = synth_hcl(app)
+    return sub_stack, app_stack.tf_vars, stacks_hcl, time.perf_counter() - start
+
+
+def run_cdktf_parallel(config, workers, sub_stacks=None):
+    """run cdktf stacks in worker processes, one App per stack,
+    returns config with merged tf_vars and hcl content by stack name.
+    construct and synth seconds are added to eztf stack_seconds by stack name"""
+    config["eztf"]["tf_vars"] = config["eztf"].get("tf_vars", {})
+    stack_seconds = config["eztf"].setdefault("stack_seconds", {})
+    config_stack = config["eztf"]["stacks"]
+    tfstacks = set(config["eztf"].get("tf_stacks", []))
+    if sub_stacks is not None:
+        tfstacks &= set(sub_stacks)
+
+    stacks_hcl = {}
+    # jsii kernel of parent process can not be shared with forked children
+    mp_context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(
+        max_workers=workers, mp_context=mp_context, initializer=profiling.disable
+    ) as executor:
+        futures = [
+            executor.submit(
+                synth_stack, stack_config(config, sub_stack), sub_stack, range_resources
+            )
+            for sub_stack, range_resources in config_stack.items()
+            if sub_stack in tfstacks
+        ]
+        for future in futures:
+            sub_stack, tf_vars, stack_hcl, seconds = future.result()
+            config["eztf"]["tf_vars"][sub_stack] = tf_vars
+            stacks_hcl.update(stack_hcl)
+            for stack_name in stack_hcl:
+                stack_seconds[stack_name] = stack_seconds.get(stack_name, 0) + seconds
+
+    return config, stacks_hcl
+
+
+def invoke_aspects(app, stack):
+    """visits constructs of a stack with aspects added to the app or the stack,
+    as App.synth does, raises on error annotations of visited constructs.
+    aspects of nested constructs are not looked up, generators add none and
+    walking every construct through jsii costs as much as synth"""
+    aspects = [*Aspects.of(app).all, *Aspects.of(stack).all]
+    if not aspects:
+        return
+    constructs = stack.node.find_all()
+    for construct in constructs:
+        for aspect in aspects:
+            aspect.visit(construct)
+    errors = [
+        f"[{construct.node.path}] {entry.data}"
+        for construct in constructs
+        for entry in construct.node.metadata
+        if entry.type == ERROR_ANNOTATION
+    ]
+    if errors:
+        raise ValueError("Encountered error annotations:\n" + "\n".join(errors))
+
+
+def synth_hcl(app, stack_seconds=None):
+    """synthesize app stacks in memory, returns hcl content by stack name.
+    prepare and hcl seconds are added to stack_seconds by stack name, when given"""
+    stacks = [stack for stack in app.node.children if TerraformStack.is_stack(stack)]
+    seconds = {}
+    with profiling.phase("prepare"):
+        for stack in stacks:
+            start = time.perf_counter()
+            stack.prepare_stack()
+            seconds[stack.node.id] = time.perf_counter() - start
+        for stack in stacks:
+            start = time.perf_counter()
+            invoke_aspects(app, stack)
+            seconds[stack.node.id] += time.perf_counter() - start
+    stacks_hcl = {}
+    for stack in stacks:
+        start = time.perf_counter()
+        with profiling.phase("hcl", stack=stack.node.id):
+            stack.run_all_validations()
+            stacks_hcl[stack.node.id] = stack.to_hcl_terraform()["hcl"]
+        seconds[stack.node.id] += time.perf_counter() - start
+    if stack_seconds is not None:
+        for stack_name, stack_time in seconds.items():
+            stack_seconds[stack_name] = stack_seconds.get(stack_name, 0) + stack_time
+    return stacks_hcl
+
+
 def is_stack_tf(eztf_range_resources):
     for range_resource in eztf_range_resources:
         for _, resource in range_resource.items():
@@ -74,7 +203,8 @@ if __name__ == "__main__":
 
     tfstack = tf_stacks(config_dict["eztf"]["stacks"])
     config_dict["eztf"]["tf_stacks"] = tfstack
+    app = App()
     if tfstack:
-        config_dict = run_cdktf(config_dict)
+        config_dict = run_cdktf(config_dict, app)
     app.synth()
     util.write_file_yaml(CONFIG_FILE, config_dict)
@@ -0,0 +1,171 @@
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import copy
+import pytest
+
+pytest.importorskip("cdktf")
+
+import jsii
+from cdktf import App, Annotations, Aspects, IAspect, TerraformStack
+from cdktf import TerraformVariable
+import main
+
+GENERATE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def stacks_config():
+    "config of two tf stacks whose generators need no cdktf get modules"
+    return {
+        "variable": {
+            "domain": "example.com",
+            "organization_id": "123",
+            "setup_gcs": "my-bucket",
+            "setup_project_id": "setup-prj",
+        },
+        "eztf": {
+            "stacks": {
+                "iam": [{"org_iam": "iam"}],
+                "sas": [{"sas": "service_account"}, {"settings": "tf_vars"}],
+                "k8s": [{"manifests": "yaml"}],
+            },
+        },
+        "org_iam": {
+            "my-prj": {"user:a@example.com": ["roles/viewer", "roles/editor"]},
+            "/": {"group:g@example.com": ["roles/viewer"]},
+        },
+        "sas": [{"account_id": "sa1", "project": "my-prj"}],
+        "settings": {"sa_region": "us-east1"},
+        "manifests": [{"kind": "Namespace"}],
+    }
+
+
+class TestSynth:
+
+    def test_stack_seconds(self, monkeypatch, tmp_path):
+        monkeypatch.chdir(GENERATE_DIR)
+        config = stacks_config()
+        config["eztf"]["tf_stacks"] = main.tf_stacks(config["eztf"]["stacks"])
+        assert config["eztf"]["tf_stacks"] == ["iam", "sas"]
+
+        app = App(outdir=str(tmp_path))
+        config = main.run_cdktf(config, app)
+        construct_seconds = dict(config["eztf"]["stack_seconds"])
+        stacks_hcl = main.synth_hcl(app, config["eztf"]["stack_seconds"])
+
+        stack_names = ["gcp-example-com-iam", "gcp-example-com-sas"]
+        assert sorted(stacks_hcl) == sorted(construct_seconds) == stack_names
+        for stack_name in stack_names:
+            assert (
+                config["eztf"]["stack_seconds"][stack_name]
+                > construct_seconds[stack_name]
+                > 0
+            )
+
+    def test_parallel_same_as_serial(self, monkeypatch, tmp_path):
+        monkeypatch.chdir(GENERATE_DIR)
+        serial = stacks_config()
+        serial["eztf"]["tf_stacks"] = main.tf_stacks(serial["eztf"]["stacks"])
+        parallel = stacks_config()
+        parallel["eztf"]["tf_stacks"] = main.tf_stacks(parallel["eztf"]["stacks"])
+
+        app = App(outdir=str(tmp_path))
+        serial = main.run_cdktf(serial, app)
+        serial_hcl = main.synth_hcl(app)
+        parallel, parallel_hcl = main.run_cdktf_parallel(parallel, 2)
+
+        assert parallel["eztf"]["tf_vars"] == serial["eztf"]["tf_vars"]
+        assert serial["eztf"]["tf_vars"]["sas"] == {"sa_region": "us-east1"}
+        assert parallel_hcl == serial_hcl
+        assert sorted(serial_hcl) == ["gcp-example-com-iam", "gcp-example-com-sas"]
+
+    def test_aspects(self, tmp_path):
+        @jsii.implements(IAspect)
+        class Describe:
+            def visit(self, node):
+                if isinstance(node, TerraformVariable):
+                    node.add_override("description", "set by aspect")
+
+        @jsii.implements(IAspect)
+        class Reject:
+            def visit(self, node):
+                if isinstance(node, TerraformVariable):
+                    Annotations.of(node).add_error("variables are not allowed")
+
+        app = App(outdir=str(tmp_path))
+        stack = TerraformStack(app, "gcp-example-com-iam")
+        TerraformVariable(stack, "domain")
+        Aspects.of(app).add(Describe())
+        stacks_hcl = main.synth_hcl(app)
+        assert 'description = "set by aspect"' in stacks_hcl["gcp-example-com-iam"]
+
+        app = App(outdir=str(tmp_path))
+        stack = TerraformStack(app, "gcp-example-com-iam")
+        TerraformVariable(stack, "domain")
+        Aspects.of(stack).add(Reject())
+        with pytest.raises(ValueError, match="variables are not allowed"):
+            main.synth_hcl(app)
+
+
+class TestStackConfig:
+
+    def config(self):
+        config = stacks_config()
+        config["customer_id"] = "C01"
+        config["eztf"]["stacks"]["network"] = [{"vpcs": "network"}, {"nets": "data"}]
+        config["vpcs"] = [{"network_name": "vpc-1", "subnets": []}]
+        config["router_vpcs"] = [{"name": "router-1"}]
+        config["external_vpn_gateway_vpcs"] = [{"name": "peer-1"}]
+        config["router_sas"] = [{"name": "other"}]
+        config["nets"] = [{"_eztf_resource_id": "n1", "name": "default"}]
+        config["eztf"]["tf_any_data"] = {
+            "nets": {"name": "google_compute_network"},
+            "others": {"name": "google_project"},
+        }
+        config["eztf"]["tf_any_resource"] = {"buckets": {"name": "bucket"}}
+        return config
+
+    def test_slice(self):
+        config = self.config()
+        eztf_config = main.stack_config(config, "network")
+        assert sorted(eztf_config) == [
+            "customer_id",
+            "external_vpn_gateway_vpcs",
+            "eztf",
+            "nets",
+            "router_vpcs",
+            "variable",
+            "vpcs",
+        ]
+        assert eztf_config["eztf"] == {
+            "stacks": {"network": [{"vpcs": "network"}, {"nets": "data"}]},
+            "tf_any_data": {"nets": {"name": "google_compute_network"}},
+        }
+        assert eztf_config["router_vpcs"] == [{"name": "router-1"}]
+        assert eztf_config["variable"] == config["variable"]
+
+        eztf_config = main.stack_config(config, "iam")
+        assert sorted(eztf_config) == ["customer_id", "eztf", "org_iam", "variable"]
+        assert eztf_config["eztf"] == {"stacks": {"iam": [{"org_iam": "iam"}]}}
+
+    def test_source_unchanged(self):
+        config = self.config()
+        source = copy.deepcopy(config)
+        eztf_config = main.stack_config(config, "network")
+        eztf_config["vpcs"][0]["subnets"].append({"subnet_name": "sn-1"})
+        eztf_config["router_vpcs"].append({"name": "router-2"})
+        eztf_config["variable"]["domain"] = "other.com"
+        eztf_config["eztf"]["tf_vars"] = {"network": {}}
+        assert config == source
@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""single process generation, replaces `cdktf synth --hcl && python repo.py`"""
+
+import os
+import tempfile
+import yaml
+from cdktf import App
+import util
+import main
+import repo
+import profiling
+
+SYNTH_WORKERS = int(os.environ.get("EZTF_SYNTH_WORKERS") or 1)
+
+
+def load_config(config_file, config_bucket=None):
+    "returns config dict from gcs bucket or local file"
+    with profiling.phase("load_config"):
+        if config_bucket:
+            return yaml.safe_load(util.download_from_gcs(config_bucket, config_file))
+        return util.get_file_yaml(config_file)
+
+
+def generate(config_dict, output_bucket=None, output_gcs_prefix=None, output_dir=None):
+    """synthesizes tf stacks in memory and creates output repository,
+    returns output details. profile report is written when profiling"""
+    try:
+        return _generate(config_dict, output_bucket, output_gcs_prefix, output_dir)
+    finally:
+        profiling.write_report()
+
+
+def _generate(config_dict, output_bucket, output_gcs_prefix, output_dir):
+    tfstack = main.tf_stacks(config_dict["eztf"]["stacks"])
+    config_dict["eztf"]["tf_stacks"] = tfstack
+    _, output_folder, _ = repo.repo_details(config_dict, output_dir)
+    fingerprints = repo.stack_fingerprints(config_dict)
+    sub_stacks = repo.stacks_to_generate(output_folder, fingerprints)
+    synth_stacks = sub_stacks.intersection(tfstack)
+
+    stacks_hcl = {}
+    if SYNTH_WORKERS > 1 and len(synth_stacks) > 1:
+        # stacks are synthesized in worker processes, profiled as one phase
+        with profiling.phase("synth_parallel"):
+            config_dict, stacks_hcl = main.run_cdktf_parallel(
+                config_dict, SYNTH_WORKERS, synth_stacks
+            )
+    elif synth_stacks:
+        # cdktf App always creates its outdir, nothing is written into it
+        with tempfile.TemporaryDirectory(prefix="cdktf-") as outdir:
+            app = App(outdir=outdir)
+            with profiling.phase("construct"):
+                config_dict = main.run_cdktf(config_dict, app, synth_stacks)
+            with profiling.phase("synth"):
+                stacks_hcl = main.synth_hcl(
+                    app, config_dict["eztf"]["stack_seconds"]
+                )
+    return repo.main(
+        config_dict,
+        stacks_hcl,
+        fingerprints,
+        output_bucket,
+        output_gcs_prefix,
+        output_dir,
+    )
+
+
+if __name__ == "__main__":
+    CONFIG_BUCKET = os.environ.get("EZTF_CONFIG_BUCKET")
+    CONFIG_FILE = os.environ.get("EZTF_INPUT_CONFIG")
+    if not CONFIG_FILE:
+        raise ValueError("EZTF_INPUT_CONFIG missing")
+
+    output_folder = generate(load_config(CONFIG_FILE, CONFIG_BUCKET))["output_folder"]
+    if repo.EZTF_MODE == "service":
+        util.delete_folders([output_folder])
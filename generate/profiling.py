@@ -0,0 +1,136 @@
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""opt in per phase profiling, enabled with EZTF_PROFILE=true
+
+every phase records wall time, traced memory growth peak and constructs
+created, write_report stores them as json and optionally a cProfile dump.
+memory tracing slows python code and imports down, EZTF_PROFILE_MEMORY=false
+skips it
+"""
+
+import os
+import json
+import time
+import cProfile
+import threading
+import tracemalloc
+import contextlib
+
+PROFILE = os.environ.get("EZTF_PROFILE", "").lower() == "true"
+PROFILE_OUTPUT = (
+    os.environ.get("EZTF_PROFILE_OUTPUT") or "../ezytf-gen-data/eztf-profile.json"
+)
+PROFILE_CPROFILE = os.environ.get("EZTF_PROFILE_CPROFILE")
+PROFILE_MEMORY = os.environ.get("EZTF_PROFILE_MEMORY", "true").lower() == "true"
+PROFILE_SLOWEST = 10
+
+_records = []
+_open_phases = []
+_profiler = None
+
+
+def start():
+    "starts memory tracing and cProfile of the process, once"
+    global _profiler
+    if PROFILE_MEMORY and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    if PROFILE_CPROFILE and _profiler is None:
+        _profiler = cProfile.Profile()
+        _profiler.enable()
+
+
+def _constructs(scope):
+    return len(scope.node.children) if scope is not None else 0
+
+
+@contextlib.contextmanager
+def phase(name, scope=None, **labels):
+    """records a phase when profiling, labels like stack, resource and range
+    identify it, constructs added to scope are counted. yields the record,
+    None when not recorded. phases of worker threads are not recorded,
+    memory peak is process wide"""
+    if not PROFILE or threading.current_thread() is not threading.main_thread():
+        yield None
+        return
+    start()
+    record = {"phase": name, **labels}
+    _records.append(record)
+    current = {"peak": 0, "base": 0}
+    if PROFILE_MEMORY:
+        # peak so far belongs to the enclosing phase, the new one starts from here
+        traced, peak = tracemalloc.get_traced_memory()
+        if _open_phases:
+            _open_phases[-1]["peak"] = max(_open_phases[-1]["peak"], peak)
+        tracemalloc.reset_peak()
+        current["base"] = traced
+    _open_phases.append(current)
+    constructs = _constructs(scope)
+    start_time = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record["seconds"] = round(time.perf_counter() - start_time, 4)
+        _open_phases.pop()
+        if PROFILE_MEMORY:
+            peak = max(current["peak"], tracemalloc.get_traced_memory()[1])
+            record["peak_mb"] = round((peak - current["base"]) / 1024 / 1024, 2)
+            if _open_phases:
+                _open_phases[-1]["peak"] = max(_open_phases[-1]["peak"], peak)
+            tracemalloc.reset_peak()
+        if scope is not None:
+            record["constructs"] = _constructs(scope) - constructs
+
+
+def count_constructs(record, stack):
+    "sets constructs of a stack created within the phase of record"
+    if record is not None:
+        record["constructs"] = _constructs(stack)
+
+
+def disable():
+    """turns profiling off, initializer of synth worker processes which
+    inherit EZTF_PROFILE but whose records would be lost"""
+    global PROFILE
+    PROFILE = False
+
+
+def report():
+    "returns recorded phases and the slowest resource ranges"
+    ranges = [record for record in _records if record["phase"] == "resource"]
+    return {
+        "phases": _records,
+        "slowest_ranges": sorted(
+            ranges, key=lambda record: record["seconds"], reverse=True
+        )[:PROFILE_SLOWEST],
+    }
+
+
+def write_report(output_file=None):
+    "writes json report and cProfile dump when profiling, clears recorded phases"
+    global _profiler
+    if not PROFILE:
+        return
+    output_file = output_file or PROFILE_OUTPUT
+    os.makedirs(os.path.dirname(output_file) or ".", exist_ok=True)
+    with open(output_file, "w", encoding="utf-8") as fp:
+        json.dump(report(), fp, indent=2)
+    print(f"Profile report written to {output_file}")
+    if _profiler is not None:
+        _profiler.disable()
+        os.makedirs(os.path.dirname(PROFILE_CPROFILE) or ".", exist_ok=True)
+        _profiler.dump_stats(PROFILE_CPROFILE)
+        print(f"cProfile stats written to {PROFILE_CPROFILE}")
+        _profiler = None
+    _records.clear()
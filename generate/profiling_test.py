@@ -0,0 +1,82 @@
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import tracemalloc
+from types import SimpleNamespace
+import profiling
+
+
+class TestProfiling:
+
+    def test_disabled(self, monkeypatch, tmp_path):
+        monkeypatch.setattr(profiling, "PROFILE", False)
+        with profiling.phase("stack", stack="iam"):
+            pass
+        profiling.write_report(str(tmp_path / "profile.json"))
+        assert not (tmp_path / "profile.json").exists()
+
+    def test_phases_report(self, monkeypatch, tmp_path):
+        monkeypatch.setattr(profiling, "PROFILE", True)
+        monkeypatch.setattr(profiling, "PROFILE_CPROFILE", None)
+        monkeypatch.setattr(profiling, "_records", [])
+        scope = SimpleNamespace(node=SimpleNamespace(children=[]))
+        tracing = tracemalloc.is_tracing()
+
+        with profiling.phase("stack", stack="iam"):
+            with profiling.phase("resource", scope, stack="iam", range="sas"):
+                scope.node.children = ["sa1", "sa2"]
+                data = bytearray(4 * 1024 * 1024)
+            del data
+            with profiling.phase("resource", scope, stack="iam", range="org_iam"):
+                pass
+        output_file = tmp_path / "profile" / "profile.json"
+        profiling.write_report(str(output_file))
+        if not tracing:
+            tracemalloc.stop()
+
+        report = json.loads(output_file.read_text())
+        assert [record["phase"] for record in report["phases"]] == [
+            "stack",
+            "resource",
+            "resource",
+        ]
+        stack, sas, org_iam = report["phases"]
+        assert sas["constructs"] == 2 and org_iam["constructs"] == 0
+        assert sas["peak_mb"] >= 4 and stack["peak_mb"] >= 4
+        assert org_iam["peak_mb"] < 1
+        seconds = [record["seconds"] for record in report["slowest_ranges"]]
+        assert seconds == sorted([sas["seconds"], org_iam["seconds"]], reverse=True)
+        assert profiling._records == []
+
+    def test_stack_constructs(self, monkeypatch):
+        monkeypatch.setattr(profiling, "PROFILE", True)
+        monkeypatch.setattr(profiling, "PROFILE_MEMORY", False)
+        monkeypatch.setattr(profiling, "PROFILE_CPROFILE", None)
+        monkeypatch.setattr(profiling, "_records", [])
+        stack = SimpleNamespace(node=SimpleNamespace(children=["sa1", "sa2", "b1"]))
+
+        with profiling.phase("stack", stack="iam") as record:
+            pass
+        profiling.count_constructs(record, stack)
+        assert profiling._records == [record]
+        assert record["stack"] == "iam" and record["constructs"] == 3
+
+    def test_disable(self, monkeypatch):
+        monkeypatch.setattr(profiling, "PROFILE", True)
+        monkeypatch.setattr(profiling, "_records", [])
+        profiling.disable()
+        with profiling.phase("stack", stack="iam") as record:
+            profiling.count_constructs(record, None)
+        assert record is None and profiling._records == []
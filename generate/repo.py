@@ -13,8 +13,13 @@
 # limitations under the License.
 
 import os
-import copy
+import re
+import glob
+import time
+import importlib.metadata
+from concurrent.futures import Future, ThreadPoolExecutor
 import util
+import profiling
 import templating as templ
 
 CONFIG_FILE = os.environ.get("EZTF_INPUT_CONFIG")
@@ -25,22 +30,124 @@ SSM_HOST = os.environ.get("EZTF_SSM_HOST")
 EZTF_MODE = os.environ.get("EZTF_MODE")
 EZTF_OUTPUT_GCS_PREFIX = os.environ.get("EZTF_OUTPUT_GCS_PREFIX")
 CDKTF_OUTPUT_DIR = os.environ.get("EZTF_CDK_OUTPUT_DIR") or "cdktf.out"
+EZTF_INCREMENTAL = os.environ.get("EZTF_INCREMENTAL", "").lower() == "true"
+EZTF_TFVARS_JSON = os.environ.get("EZTF_TFVARS_JSON", "").lower() == "true"
+EZTF_GCS_SYNC = os.environ.get("EZTF_GCS_SYNC", "").lower() == "true"
+GIT_CACHE_DIR = os.environ.get("EZTF_GIT_CACHE_DIR")
+CREATOR_WORKERS = int(os.environ.get("EZTF_CREATOR_WORKERS") or 8)
+EZTF_SYNC_OUTPUT = os.environ.get("EZTF_SYNC_OUTPUT", "").lower() == "true"
+
+GENERATOR_DIR = os.path.dirname(os.path.abspath(__file__))
+GENERATOR_FILES = [
+    "*.py",
+    "resources/*.py",
+    "cdktf.json",
+    "../templates/*/*",
+    "imports/**/*.py",
+    "imports/**/*.tgz",
+]
+
+
+def remote_git_uri(repo_name, git_uri):
+    "returns git uri of the repository, looked up or created in ssm when not set"
+    if SSM_HOST and not git_uri:
+        return util.ssm_repository(repo_name, SSM_HOST)
+    return git_uri
 
 
-def code_push_remote(repo_name, repo_folder, git_uri):
-    """pushed to remote repository/bucket"""
-    if OUTPUT_BUCKET:
-        gcs_prefix = (
-            EZTF_OUTPUT_GCS_PREFIX
-            or f"eztf-output/{repo_name}/{repo_name}-{util.time_str()}/"
-        )
-        util.upload_folder_to_gcs_parallel(OUTPUT_BUCKET, repo_folder, gcs_prefix)
+def start_remote_git_uri(repo_name, git_uri):
+    "starts ssm lookup in background, so it runs while files are generated"
+    executor = ThreadPoolExecutor(max_workers=1)
+    future = executor.submit(remote_git_uri, repo_name, git_uri)
+    executor.shutdown(wait=False)
+    return future
 
-    if SSM_HOST and not git_uri:
-        git_uri = util.ssm_repository(repo_name, SSM_HOST)
 
+def gcs_output_prefix(repo_name, output_gcs_prefix=None):
+    "returns bucket prefix output is uploaded to"
+    if EZTF_GCS_SYNC:
+        default_prefix = f"eztf-output/{repo_name}/latest/"
+    else:
+        default_prefix = f"eztf-output/{repo_name}/{repo_name}-{util.time_str()}/"
+    return output_gcs_prefix or EZTF_OUTPUT_GCS_PREFIX or default_prefix
+
+
+def gcs_sink(
+    repo_name, repo_folder, output_bucket, output_gcs_prefix, manifest, uploaded
+):
+    "uploads output folder to bucket, skips files already uploaded by the queue"
+    gcs_prefix = gcs_output_prefix(repo_name, output_gcs_prefix)
+    if EZTF_GCS_SYNC:
+        util.sync_folder_to_gcs(output_bucket, repo_folder, gcs_prefix, manifest)
+        return
+    if uploaded:
+        if manifest is None:
+            manifest = {
+                folder_file_path: {}
+                for _, folder_file_path in util.folder_files(repo_folder)
+            }
+        manifest = {
+            name: entry for name, entry in manifest.items() if name not in uploaded
+        }
+        print(f"uploaded {len(uploaded)} files while generating")
+    util.upload_folder_to_gcs_parallel(output_bucket, repo_folder, gcs_prefix, manifest)
+
+
+def git_sink(repo_name, repo_folder, git_uri):
+    "pushes output folder to git, git_uri can be a pending ssm lookup"
+    if isinstance(git_uri, Future):
+        git_uri = git_uri.result()
+    else:
+        git_uri = remote_git_uri(repo_name, git_uri)
     if git_uri:
-        util.push_folder_to_git(repo_folder, git_uri, "auto")
+        util.push_folder_to_git(repo_folder, git_uri, "auto", GIT_CACHE_DIR)
+
+
+def run_sink(name, func, *args):
+    "runs a sink, returns its error instead of raising"
+    try:
+        func(*args)
+    except Exception as err:
+        print(f"Failed to push to {name} due to exception: {err}")
+        return err
+    return None
+
+
+def code_push_remote(
+    repo_name,
+    repo_folder,
+    git_uri,
+    output_bucket=None,
+    output_gcs_prefix=None,
+    manifest=None,
+    uploaded=None,
+):
+    """pushed to remote repository/bucket concurrently, files to upload are taken
+    from the run manifest when provided, uploaded files are skipped.
+    errors are reported per sink and raised once every sink is done"""
+    output_bucket = output_bucket or OUTPUT_BUCKET
+    sinks = []
+    if output_bucket:
+        sinks.append(
+            (
+                "gcs",
+                gcs_sink,
+                repo_name,
+                repo_folder,
+                output_bucket,
+                output_gcs_prefix,
+                manifest,
+                uploaded,
+            )
+        )
+    if git_uri or SSM_HOST:
+        sinks.append(("git", git_sink, repo_name, repo_folder, git_uri))
+
+    results = util.ordered_thread_map(run_sink, sinks, len(sinks))
+    errors = {sink[0]: err for sink, err in zip(sinks, results) if err}
+    if errors:
+        err = next(iter(errors.values()))
+        raise RuntimeError(f"Failed to push to {','.join(errors)}") from err
 
 
 def resource_in_stack(stack_dict, stack_name):
@@ -54,7 +161,7 @@ def resource_in_stack(stack_dict, stack_name):
 
 def stack_variables(config, stack_name, merge_common_vars=False):
     if merge_common_vars:
-        vars = copy.deepcopy(config.get("variable", {}))
+        vars = dict(config.get("variable", {}))
     else:
         vars = {}
     for rr in config["eztf"]["stacks"].get(stack_name, []):
@@ -64,40 +171,213 @@ def stack_variables(config, stack_name, merge_common_vars=False):
     return vars
 
 
-def tf_creator(repo_folder, config_dict, clean_org):
-    "splits tf file"
+def package_versions():
+    "returns installed versions of cdktf and its provider packages"
+    versions = {}
+    for dist in importlib.metadata.distributions():
+        name = (dist.metadata["Name"] or "").lower().replace("_", "-")
+        if name == "cdktf" or name.startswith("cdktf-cdktf-provider-"):
+            versions[name] = dist.version
+    return versions
+
+
+def generator_version():
+    """returns hash of generator code, templates, cdktf get bindings in imports/
+    and versions of cdktf packages"""
+    files = []
+    for pattern in GENERATOR_FILES:
+        files.extend(glob.glob(pattern, root_dir=GENERATOR_DIR, recursive=True))
+    return util.data_hash(
+        {
+            "files": util.files_hash(files, GENERATOR_DIR),
+            "packages": package_versions(),
+        }
+    )
+
+
+def stack_fingerprint(config, stack_name, code_version):
+    """returns hash of everything a stack output is generated from,
+    tf_ref only resolves resources created within the same stack"""
+    range_resources = config["eztf"]["stacks"].get(stack_name, [])
+    ranges, details = util.stack_ranges(config, stack_name)
+    return util.data_hash(
+        {
+            "code_version": code_version,
+            "range_resources": range_resources,
+            "ranges": ranges,
+            "details": details,
+            "variable": config.get("variable", {}),
+            "customer_id": config.get("customer_id"),
+        }
+    )
+
+
+def stack_fingerprints(config):
+    "returns fingerprint of every stack"
+    code_version = generator_version()
+    if EZTF_TFVARS_JSON:
+        code_version += ":tfvars.json"
+    return {
+        stack_name: stack_fingerprint(config, stack_name, code_version)
+        for stack_name in config["eztf"]["stacks"]
+    }
+
+
+def fingerprint_file(output_folder):
+    "fingerprint manifest stored next to the output folder"
+    return f"{output_folder}.fingerprint.json"
+
+
+def previous_fingerprints(output_folder):
+    "returns stack fingerprints of the previous run"
+    manifest_file = fingerprint_file(output_folder)
+    if not os.path.isdir(output_folder) or not os.path.exists(manifest_file):
+        return {}
+    return util.get_file_json(manifest_file).get("stacks", {})
+
+
+def changed_stacks(fingerprints, previous):
+    "returns stacks which needs to be generated"
+    return {
+        stack_name
+        for stack_name, fingerprint in fingerprints.items()
+        if previous.get(stack_name) != fingerprint
+    }
+
+
+def manifest_file(output_folder):
+    "run manifest of output files stored next to the output folder"
+    return f"{output_folder}.manifest.json"
+
+
+def previous_manifest(output_folder):
+    "returns run manifest of the previous run"
+    run_manifest = manifest_file(output_folder)
+    if not os.path.isdir(output_folder) or not os.path.exists(run_manifest):
+        return {}
+    return util.get_file_json(run_manifest)
+
+
+def output_manifest(output_folder, sources, stack_seconds, sub_stacks):
+    """returns run manifest of every output file with its stack, source range,
+    creator, size and hashes and the seconds spent on each generated stack,
+    entries of stacks not generated in this run are reused when unchanged"""
+    previous = previous_manifest(output_folder) if EZTF_INCREMENTAL else {}
+    kept_stacks = set()
+    if os.path.isdir(output_folder):
+        kept_stacks = {
+            entry.name
+            for entry in os.scandir(output_folder)
+            if entry.is_dir() and entry.name not in sub_stacks
+        }
+    files = util.folder_manifest(
+        output_folder, sources, previous.get("files"), kept_stacks
+    )
+    seconds = dict(previous.get("stack_seconds", {}))
+    seconds.update(stack_seconds)
+    return {
+        "files": files,
+        "stack_seconds": {
+            stack_name: round(seconds[stack_name], 3)
+            for stack_name in sorted(seconds)
+            if stack_name in sub_stacks or stack_name in kept_stacks
+        },
+    }
+
+
+def clean_output_folder(output_folder, sub_stacks):
+    "deletes output of given stacks and top level files"
+    util.delete_folders([f"{output_folder}/{sub_stack}" for sub_stack in sub_stacks])
+    if os.path.isdir(output_folder):
+        for entry in os.scandir(output_folder):
+            if entry.is_file() and not entry.name.startswith("."):
+                os.remove(entry.path)
+
+
+def staging_folder(output_folder):
+    "folder output is generated in before syncing, keeps the output folder name"
+    return os.path.join(
+        os.path.dirname(output_folder) or ".",
+        ".eztf-staging",
+        os.path.basename(output_folder),
+    )
+
+
+def tf_creator(
+    repo_folder,
+    config_dict,
+    clean_org,
+    stacks_hcl=None,
+    sub_stacks=None,
+    publish=None,
+):
+    """splits tf file, from in memory synthesized hcl when provided,
+    every finished stack folder is passed to publish.
+    returns source of created files and seconds spent on each stack"""
+    sources = {}
+    stack_seconds = {}
     tfstacks = config_dict["eztf"].get("tf_stacks", [])
     tf_vars = config_dict["eztf"].get("tf_vars", {})
     stacks = config_dict["eztf"].get("stacks", {})
     vars = config_dict["variable"]
 
     for config_sub_stack in tfstacks:
+        if sub_stacks is not None and config_sub_stack not in sub_stacks:
+            continue
+        start = time.perf_counter()
         stack_name = f"gcp-{clean_org}-{config_sub_stack}"
-        cdktf_out_file = util.cdktf_output(
-            stack_name=stack_name, output_folder=CDKTF_OUTPUT_DIR
-        )
         repo_subfolder_path = f"{repo_folder}/{config_sub_stack}"
-        util.split_tf_file(cdktf_out_file, repo_subfolder_path)
+        with profiling.phase("split_tf", stack=config_sub_stack):
+            if stacks_hcl is not None:
+                tf_files = util.split_tf_content(
+                    stacks_hcl[stack_name], repo_subfolder_path
+                )
+            else:
+                cdktf_out_file = util.cdktf_output(
+                    stack_name=stack_name, output_folder=CDKTF_OUTPUT_DIR
+                )
+                tf_files = util.split_tf_file(cdktf_out_file, repo_subfolder_path)
+        # tf files are named after the range they are synthesized from
+        range_resources = {}
+        for rr in stacks.get(config_sub_stack, []):
+            range_resources.update(rr)
+        for tf_file in tf_files:
+            range = tf_file.removesuffix(".tf")
+            sources[os.path.join(config_sub_stack, tf_file)] = {
+                "range": range if range in range_resources else None,
+                "creator": range_resources.get(range, "cdktf"),
+            }
         if stack_tf_vars := tf_vars.get(config_sub_stack):
-            util.tf_vars_file(stack_tf_vars, repo_subfolder_path)
+            with profiling.phase("tf_vars", stack=config_sub_stack):
+                tf_vars_filename = util.tf_vars_file(
+                    stack_tf_vars, repo_subfolder_path, EZTF_TFVARS_JSON
+                )
+            sources[os.path.join(config_sub_stack, tf_vars_filename)] = {
+                "range": None,
+                "creator": "tf_vars",
+            }
         tf_resources = resource_in_stack(stacks, config_sub_stack)
         stack_vars = stack_variables(config_dict, config_sub_stack)
         templ.create_templated_file(
             repo_subfolder_path, tf_resources + ["tf"], stack_vars
         )
+        stack_seconds[config_sub_stack] = time.perf_counter() - start
+        if publish:
+            publish(repo_subfolder_path)
 
     if len(tfstacks) > 0:
         templ.setup_script(repo_folder, vars, True)
+    return sources, stack_seconds
 
 
 def yaml_json_creator(repo_folder, config, range, resource, stack_name):
     "json yaml file creator"
     for i, item in enumerate(config.get(range, [])):
-        my_item = copy.deepcopy(item)
+        my_item = item
         filename = ""
-        if isinstance(my_item, dict) and my_item.get("eztf_filename"):
-            filename = my_item.get("eztf_filename")
-            del my_item["eztf_filename"]
+        if isinstance(item, dict) and item.get("eztf_filename"):
+            filename = item.get("eztf_filename")
+            my_item = util.dict_without_keys(item, ["eztf_filename"])
         filename = util.eztf_filename(filename, resource, range, i)
         yield filename
         if resource == "yaml":
@@ -109,36 +389,33 @@ def yaml_json_creator(repo_folder, config, range, resource, stack_name):
 def anyfile_creator(repo_folder, config, range, resource, stack_name):
     "any file creator"
     for i, item in enumerate(config.get(range, [])):
-        vars = copy.deepcopy(item)
+        vars = util.dict_without_keys(item, ["eztf_filename", "content"])
         filename = item.get("eztf_filename", "")
         content = item.get("content", "")
-        vars.pop("eztf_filename", None)
-        vars.pop("content", None)
         filename = util.eztf_filename(filename, "", range, i)
         yield filename
         util.write_file_any(f"{repo_folder}/{filename}", content, vars, mode="a")
 
 
 def jsonl_creator(repo_folder, config, range, resource, stack_name):
-    "jsonl file creator"
-    item = copy.deepcopy(config.get(range, []))
+    "jsonl file creator, streams items of the range"
     filename = util.eztf_filename("", "jsonl", range, 0)
-    util.write_file_jsonl(f"{repo_folder}/{filename}", item)
+    util.write_file_jsonl(f"{repo_folder}/{filename}", config.get(range, []))
     yield filename
 
 
 def curl_creator(repo_folder, config, range, resource, stack_name):
     "curl command creator"
     for i, item in enumerate(config.get(range, [])):
-        my_item = copy.deepcopy(item)
         filename = ""
         content = []
-        if isinstance(my_item, dict):
-            filename = my_item.pop("eztf_filename", "")
+        if isinstance(item, dict):
+            filename = item.get("eztf_filename", "")
+            my_item = util.dict_without_keys(item, ["eztf_filename"])
             content.append(util.generate_curl_command(**my_item))
-        elif isinstance(my_item, list):
-            for cmd in my_item:
-                cmd.pop("eztf_filename", None)
+        elif isinstance(item, list):
+            for cmd in item:
+                cmd = util.dict_without_keys(cmd, ["eztf_filename"])
                 content.append(util.generate_curl_command(**cmd))
         filename = util.eztf_filename(filename, "sh", range, i)
         yield filename
@@ -149,14 +426,11 @@ def cmd_creator(repo_folder, config, range, resource, stack_name):
     "cmd command creator"
     content = []
     for i, item in enumerate(config.get(range, [])):
-        my_item = copy.deepcopy(item)
-        cmd = my_item["cmd"]
-        if isinstance(my_item, str):
+        cmd = item["cmd"]
+        if isinstance(cmd, str):
             cmd = [cmd]
         content.append(
-            util.generate_command(
-                cmd, my_item.get("options", {}), my_item.get("vars", {})
-            )
+            util.generate_command(cmd, item.get("options", {}), item.get("vars", {}))
         )
     filename = util.eztf_filename("", "sh", range, 0)
     yield filename
@@ -167,8 +441,8 @@ def setup_script_creator(repo_folder, config, range, resource, stack_name):
     "add scripts file and env var in repo folder"
     vars = stack_variables(config, stack_name)
     is_tf = True if stack_name in config.get("eztf", {}).get("tf_stacks", []) else False
-    templ.setup_script(repo_folder, vars, is_tf)
-    yield "script_env"
+    # runs in a creator thread, created files are reported by stack_creator
+    yield from templ.setup_script(repo_folder, vars, is_tf, report=False)
 
 
 def env_var_creator(repo_folder, config, range, resource, stack_name):
@@ -197,29 +471,61 @@ creator_function = {
 }
 
 
-def my_creator(repo_folder, config):
-    "other supported file creator"
-    for config_sub_stack, range_resource in config["eztf"]["stacks"].items():
-        output_files = []
-        repo_subfolder_path = f"{repo_folder}/{config_sub_stack}"
-        for rr in range_resource:
-            for range, resource in rr.items():
-                if creator_function.get(resource):
-                    filename_yield_op = creator_function[resource](
-                        repo_subfolder_path, config, range, resource, config_sub_stack
+def stack_creator(repo_folder, config, config_sub_stack, range_resource, publish=None):
+    """other supported file creator of a stack, the folder of a non tf stack
+    is passed to publish once created, tf stacks are finished later.
+    returns source of created files, seconds spent and its output line,
+    printed by the caller in stack order"""
+    start = time.perf_counter()
+    output_files = []
+    sources = {}
+    repo_subfolder_path = f"{repo_folder}/{config_sub_stack}"
+    for rr in range_resource:
+        for range, resource in rr.items():
+            if creator_function.get(resource):
+                filename_yield_op = creator_function[resource](
+                    repo_subfolder_path, config, range, resource, config_sub_stack
+                )
+                for filename in filename_yield_op or []:
+                    output_files.append(filename)
+                    sources.setdefault(
+                        os.path.join(config_sub_stack, filename),
+                        {"range": range, "creator": resource},
                     )
-                    if filename_yield_op:
-                        output_files.extend(list(filename_yield_op))
-        if output_files:
-            print(
-                f"Created files: {','.join(output_files)} in {'/'.join(repo_subfolder_path.split('/')[-2:])}"
-            )
+    if publish and config_sub_stack not in config["eztf"].get("tf_stacks", []):
+        publish(repo_subfolder_path)
+    output = ""
+    if output_files:
+        output = f"Created files: {','.join(output_files)} in {'/'.join(repo_subfolder_path.split('/')[-2:])}"
+    return sources, time.perf_counter() - start, output
+
+
+def my_creator(repo_folder, config, sub_stacks=None, publish=None):
+    """other supported file creator, stacks write to their own folder
+    so they run in parallel, output is printed in stack order.
+    publish is called from the creator threads.
+    returns source of created files and seconds spent on each stack"""
+    stack_args = [
+        (repo_folder, config, config_sub_stack, range_resource, publish)
+        for config_sub_stack, range_resource in config["eztf"]["stacks"].items()
+        if sub_stacks is None or config_sub_stack in sub_stacks
+    ]
+    results = util.ordered_thread_map(stack_creator, stack_args, CREATOR_WORKERS)
+    sources = {}
+    stack_seconds = {}
+    for args, (stack_sources, seconds, output) in zip(stack_args, results):
+        if output:
+            print(output)
+        sources.update(stack_sources)
+        stack_seconds[args[2]] = seconds
     templ.create_templated_file(
         repo_folder, ["_root"], {"stack_list": config["eztf"]["stacks"].keys()}
     )
+    return sources, stack_seconds
 
 
-def main(config_dict):
+def repo_details(config_dict, output_dir=None):
+    "returns repository name, local output folder and git uri"
     variable = config_dict["variable"]
     domain = variable["domain"]
     config_type = variable.get("ez_config_name") or "ezy"
@@ -227,18 +533,140 @@ def main(config_dict):
 
     clean_domain = util.clean_res_id(domain)
     repo = f"gcp-{clean_domain}-{config_type}"
-    output_folder = f"{LOCAL_OUTPUT_DIR}/{repo}"
+    output_folder = f"{output_dir or LOCAL_OUTPUT_DIR}/{repo}"
+    return repo, output_folder, config_git_uri
+
+
+def repo_url(git_uri):
+    "returns browsable url of a git uri, ssm -git host suffix removed"
+    if not git_uri.endswith(".git"):
+        return None
+    return re.sub(r"-git(?=\..+\.sourcemanager\.dev)", "", git_uri[:-4])
 
-    util.delete_folders([output_folder])
-    my_creator(output_folder, config_dict)
-    tf_creator(output_folder, config_dict, clean_domain)
-    code_push_remote(repo, output_folder, config_git_uri)
 
-    return output_folder
+def output_details(output_folder, output_bucket, output_gcs_prefix, git_uri):
+    "returns where output of a run is stored, keys as reported by read_input"
+    if isinstance(git_uri, Future):
+        git_uri = git_uri.result()
+    details = {"output_folder": output_folder}
+    if output_bucket:
+        details["output_gcs"] = f"gs://{output_bucket}/{output_gcs_prefix}"
+    if git_uri:
+        details["git_uri"] = git_uri
+        if url := repo_url(git_uri):
+            details["repo_url"] = url
+    return details
+
+
+def stack_changes(output_folder, fingerprints):
+    """returns stacks to generate, all of them unless incremental,
+    and stacks removed since the previous run"""
+    if not EZTF_INCREMENTAL:
+        return set(fingerprints), set()
+    previous = previous_fingerprints(output_folder)
+    return changed_stacks(fingerprints, previous), set(previous) - set(fingerprints)
+
+
+def stacks_to_generate(output_folder, fingerprints):
+    "returns stacks to generate, all of them unless incremental"
+    return stack_changes(output_folder, fingerprints)[0]
+
+
+def main(
+    config_dict,
+    stacks_hcl=None,
+    fingerprints=None,
+    output_bucket=None,
+    output_gcs_prefix=None,
+    output_dir=None,
+):
+    """creates output repository and pushes it, returns output details"""
+    repo, output_folder, config_git_uri = repo_details(config_dict, output_dir)
+    output_bucket = output_bucket or OUTPUT_BUCKET
+    if output_bucket:
+        output_gcs_prefix = gcs_output_prefix(repo, output_gcs_prefix)
+    git_uri = config_git_uri
+    if SSM_HOST and not config_git_uri:
+        git_uri = start_remote_git_uri(repo, config_git_uri)
+    clean_domain = util.clean_res_id(config_dict["variable"]["domain"])
+    fingerprints = fingerprints or stack_fingerprints(config_dict)
+
+    sub_stacks, removed_stacks = stack_changes(output_folder, fingerprints)
+    if EZTF_INCREMENTAL:
+        print(f"Generating stacks: {','.join(sorted(sub_stacks))}")
+
+    if EZTF_SYNC_OUTPUT:
+        # every file is still rendered, into a folder next to the output folder,
+        # only changed files are moved into it by rename, others keep their mtime
+        build_folder = staging_folder(output_folder)
+        util.delete_folders([build_folder])
+        try:
+            os.rmdir(os.path.dirname(build_folder))
+        except OSError:
+            pass
+    else:
+        build_folder = output_folder
+        if EZTF_INCREMENTAL:
+            clean_output_folder(output_folder, sub_stacks | removed_stacks)
+        else:
+            util.delete_folders([output_folder])
+
+    upload_queue = None
+    if output_bucket and not EZTF_GCS_SYNC:
+        # stacks are uploaded as soon as they are done, overlapping generation
+        upload_queue = util.UploadQueue(output_bucket, output_gcs_prefix, build_folder)
+    publish = upload_queue.put_folder if upload_queue else None
+
+    with profiling.phase("my_creator"):
+        sources, stack_seconds = my_creator(
+            build_folder, config_dict, sub_stacks, publish
+        )
+    with profiling.phase("tf_creator"):
+        tf_sources, tf_seconds = tf_creator(
+            build_folder, config_dict, clean_domain, stacks_hcl, sub_stacks, publish
+        )
+    with profiling.phase("upload_queue"):
+        uploaded = upload_queue.join() if upload_queue else None
+    # tf files override same named files of other creators, as in the folder
+    sources.update(tf_sources)
+    # construct and synth seconds of tf stacks are kept by cdktf stack name
+    synth_seconds = config_dict["eztf"].get("stack_seconds", {})
+    for stack_name, seconds in tf_seconds.items():
+        seconds += synth_seconds.get(f"gcp-{clean_domain}-{stack_name}", 0)
+        stack_seconds[stack_name] = stack_seconds.get(stack_name, 0) + seconds
+    if EZTF_SYNC_OUTPUT:
+        with profiling.phase("sync_output"):
+            util.sync_folder(
+                build_folder,
+                output_folder,
+                sub_stacks | removed_stacks if EZTF_INCREMENTAL else None,
+            )
+        util.delete_folders([build_folder])
+        try:
+            os.rmdir(os.path.dirname(build_folder))
+        except OSError:
+            pass
+    util.write_file_json(fingerprint_file(output_folder), {"stacks": fingerprints})
+    with profiling.phase("manifest"):
+        manifest = output_manifest(output_folder, sources, stack_seconds, sub_stacks)
+    util.write_file_json(manifest_file(output_folder), manifest)
+    with profiling.phase("push"):
+        code_push_remote(
+            repo,
+            output_folder,
+            git_uri,
+            output_bucket,
+            output_gcs_prefix,
+            manifest["files"],
+            uploaded,
+        )
+
+    return output_details(output_folder, output_bucket, output_gcs_prefix, git_uri)
 
 
 if __name__ == "__main__":
     config_dict = util.get_file_yaml(CONFIG_FILE)
-    output_folder = main(config_dict)
+    output_folder = main(config_dict)["output_folder"]
+    profiling.write_report()
     if EZTF_MODE == "service":
         util.delete_folders([output_folder, CDKTF_OUTPUT_DIR])
@@ -0,0 +1,331 @@
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import copy
+import threading
+import pytest
+import repo
+
+
+class TestCodePushRemote:
+
+    def test_caller_gcs_prefix(self, monkeypatch):
+        synced = []
+        monkeypatch.setattr(repo, "EZTF_GCS_SYNC", True)
+        monkeypatch.setattr(repo, "EZTF_OUTPUT_GCS_PREFIX", None)
+        monkeypatch.setattr(repo, "SSM_HOST", None)
+        monkeypatch.setattr(
+            repo.util,
+            "sync_folder_to_gcs",
+            lambda bucket, folder, prefix, manifest: synced.append(prefix),
+        )
+        assert repo.gcs_output_prefix("org") == "eztf-output/org/latest/"
+        repo.code_push_remote("org", "/tmp/org", "", "b", "eztf-output/org/latest/")
+        assert synced == ["eztf-output/org/latest/"]
+
+        monkeypatch.setattr(repo, "EZTF_GCS_SYNC", False)
+        assert repo.gcs_output_prefix("org", "out/org/") == "out/org/"
+        assert repo.gcs_output_prefix("org").startswith("eztf-output/org/org-")
+
+    def test_sinks_run_concurrently(self, monkeypatch, capsys):
+        barrier = threading.Barrier(2, timeout=5)
+        pushed = []
+
+        def upload(bucket, folder, prefix, manifest):
+            barrier.wait()
+            pushed.append(("gcs", prefix))
+
+        def push(folder, git_uri, branch, cache_dir):
+            barrier.wait()
+            raise ValueError("push rejected")
+
+        monkeypatch.setattr(repo, "EZTF_GCS_SYNC", True)
+        monkeypatch.setattr(repo.util, "sync_folder_to_gcs", upload)
+        monkeypatch.setattr(repo.util, "push_folder_to_git", push)
+        monkeypatch.setattr(repo, "SSM_HOST", "ssm.example.com")
+        monkeypatch.setattr(
+            repo.util, "ssm_repository", lambda name, host: f"https://{host}/{name}"
+        )
+        git_uri = repo.start_remote_git_uri("org", "")
+
+        with pytest.raises(RuntimeError, match="Failed to push to git"):
+            repo.code_push_remote("org", "/tmp/org", git_uri, "b")
+        assert pushed == [("gcs", "eztf-output/org/latest/")]
+        assert "Failed to push to git due to exception: push rejected" in (
+            capsys.readouterr().out
+        )
+
+    def test_output_details(self):
+        git_uri = repo.start_remote_git_uri(
+            "org", "https://ssm-1-git.l.sourcemanager.dev/p/l/org.git"
+        )
+        details = repo.output_details("out/org", "b", "out/org/", git_uri)
+        assert details == {
+            "output_folder": "out/org",
+            "output_gcs": "gs://b/out/org/",
+            "git_uri": "https://ssm-1-git.l.sourcemanager.dev/p/l/org.git",
+            "repo_url": "https://ssm-1.l.sourcemanager.dev/p/l/org",
+        }
+        assert repo.output_details("out/org", None, None, "") == {
+            "output_folder": "out/org"
+        }
+
+
+class TestCreators:
+
+    def test_my_creator_output_in_stack_order(self, monkeypatch, tmp_path, capsys):
+        monkeypatch.chdir(repo.GENERATOR_DIR)
+        monkeypatch.setattr(repo, "CREATOR_WORKERS", 4)
+        config = {
+            "variable": {"domain": "example.com"},
+            "setup": {"setup_project_id": "p"},
+            "files": [{"eztf_filename": "a.yaml", "a": 1}],
+            "eztf": {
+                "stacks": {
+                    "setup": [{"setup": "setup_script"}],
+                    "k8s": [{"files": "yaml"}],
+                }
+            },
+        }
+        sources, _ = repo.my_creator(str(tmp_path / "org"), config)
+        assert capsys.readouterr().out.splitlines() == [
+            "Created files: script_env,setup_project.sh,README.md in org/setup",
+            "Created files: a.yaml in org/k8s",
+            f"Created files: README.md in {tmp_path.name}/org",
+        ]
+        assert sources[os.path.join("setup", "setup_project.sh")] == {
+            "range": "setup",
+            "creator": "setup_script",
+        }
+
+    def test_publish_from_stack_creator(self, monkeypatch, tmp_path):
+        monkeypatch.chdir(repo.GENERATOR_DIR)
+        config = {
+            "variable": {"domain": "example.com"},
+            "files": [{"eztf_filename": "a.yaml", "a": 1}],
+            "eztf": {
+                "stacks": {
+                    "k8s": [{"files": "yaml"}],
+                    "iam": [{"files": "yaml"}, {"org_iam": "iam"}],
+                },
+                "tf_stacks": ["iam"],
+            },
+        }
+        published = []
+
+        def publish(folder):
+            # the stack is published before my_creator creates the root files
+            assert not (tmp_path / "org" / "README.md").exists()
+            published.append((folder, sorted(os.listdir(folder))))
+
+        repo.my_creator(str(tmp_path / "org"), config, publish=publish)
+        assert published == [(str(tmp_path / "org" / "k8s"), ["a.yaml"])]
+
+    def test_cmd_creator(self, tmp_path):
+        config = {
+            "cmds": [
+                {"cmd": "gcloud projects list", "options": {"format": "json"}},
+                {"cmd": ["gcloud", "auth", "list"], "vars": {"ZONE": "a"}},
+            ]
+        }
+        filenames = list(repo.cmd_creator(str(tmp_path), config, "cmds", "cmd", "ops"))
+        assert filenames == ["cmds.sh"]
+        assert (tmp_path / "cmds.sh").read_text().splitlines() == [
+            "gcloud projects list --format=json",
+            "",
+            "ZONE=a",
+            "",
+            "gcloud auth list",
+        ]
+
+    def test_source_items_unchanged(self, monkeypatch, tmp_path):
+        monkeypatch.chdir(repo.GENERATOR_DIR)
+        config = {
+            "variable": {"domain": "example.com"},
+            "files": [{"eztf_filename": "a.json", "a": [1]}, {"b": {"c": 2}}],
+            "docs": [{"eztf_filename": "d.md", "content": "{{ name }}", "name": "x"}],
+            "curls": [
+                {"eztf_filename": "c.sh", "url": "https://example.com"},
+                [{"eztf_filename": "d.sh", "url": "https://example.com/d"}],
+            ],
+            "cmds": [{"cmd": "gcloud projects list", "options": {"format": "json"}}],
+            "eztf": {
+                "stacks": {
+                    "ops": [
+                        {"files": "json"},
+                        {"docs": "anyfile"},
+                        {"curls": "curl"},
+                        {"cmds": "cmd"},
+                    ],
+                }
+            },
+        }
+        source = copy.deepcopy(config)
+        sources, _ = repo.my_creator(str(tmp_path / "org"), config)
+        assert config == source
+        assert sorted(sources) == [
+            os.path.join("ops", filename)
+            for filename in [
+                "a.json",
+                "c.sh",
+                "cmds.sh",
+                "curls_1.sh",
+                "d.md",
+                "files_1.json",
+            ]
+        ]
+
+
+class TestFingerprints:
+
+    def config(self, sas):
+        return {
+            "variable": {"domain": "example.com"},
+            "sas": sas,
+            "files": [{"a": 1}],
+            "eztf": {
+                "stacks": {
+                    "iam": [{"sas": "service_account"}],
+                    "k8s": [{"files": "yaml"}],
+                }
+            },
+        }
+
+    def test_changed_stacks(self, monkeypatch, tmp_path):
+        output_folder = str(tmp_path / "org")
+        monkeypatch.setattr(repo, "EZTF_INCREMENTAL", True)
+        monkeypatch.setattr(repo, "EZTF_TFVARS_JSON", False)
+        fingerprints = repo.stack_fingerprints(self.config([{"name": "sa1"}]))
+        assert repo.previous_fingerprints(output_folder) == {}
+        sub_stacks, removed_stacks = repo.stack_changes(output_folder, fingerprints)
+        assert sub_stacks == {"iam", "k8s"} and removed_stacks == set()
+
+        os.mkdir(output_folder)
+        previous = {**fingerprints, "net": "removed"}
+        repo.util.write_file_json(
+            repo.fingerprint_file(output_folder), {"stacks": previous}
+        )
+        assert repo.previous_fingerprints(output_folder) == previous
+        assert repo.stack_changes(output_folder, fingerprints) == (set(), {"net"})
+
+        fingerprints = repo.stack_fingerprints(self.config([{"name": "sa2"}]))
+        assert repo.changed_stacks(fingerprints, previous) == {"iam"}
+        assert repo.stacks_to_generate(output_folder, fingerprints) == {"iam"}
+
+        monkeypatch.setattr(repo, "EZTF_INCREMENTAL", False)
+        assert repo.stacks_to_generate(output_folder, fingerprints) == {"iam", "k8s"}
+
+    def test_code_version_change(self, monkeypatch):
+        config = self.config([{"name": "sa1"}])
+        monkeypatch.setattr(repo, "EZTF_TFVARS_JSON", False)
+        monkeypatch.setattr(repo, "package_versions", lambda: {"cdktf": "0.20.0"})
+        previous = repo.stack_fingerprints(config)
+        assert repo.changed_stacks(repo.stack_fingerprints(config), previous) == set()
+
+        monkeypatch.setattr(repo, "package_versions", lambda: {"cdktf": "0.21.0"})
+        fingerprints = repo.stack_fingerprints(config)
+        assert repo.changed_stacks(fingerprints, previous) == {"iam", "k8s"}
+
+
+class TestManifest:
+
+    def test_output_manifest(self, monkeypatch, tmp_path):
+        monkeypatch.setattr(repo, "EZTF_INCREMENTAL", True)
+        output_folder = tmp_path / "org"
+        for stack in ["iam", "k8s"]:
+            (output_folder / stack).mkdir(parents=True)
+            (output_folder / stack / "main.tf").write_text(stack)
+        iam_file = os.path.join("iam", "main.tf")
+        previous = {
+            "files": {
+                iam_file: {"stack": "iam", "range": "sas", "md5": "kept"},
+                os.path.join("net", "main.tf"): {"stack": "net", "md5": "gone"},
+            },
+            "stack_seconds": {"iam": 1.0, "k8s": 2.0, "net": 3.0},
+        }
+        repo.util.write_file_json(repo.manifest_file(str(output_folder)), previous)
+        sources = {os.path.join("k8s", "main.tf"): {"range": "files", "creator": "tf"}}
+
+        manifest = repo.output_manifest(
+            str(output_folder), sources, {"k8s": 0.5}, {"k8s"}
+        )
+        # net was removed, iam was not generated and keeps its previous entries
+        assert manifest["stack_seconds"] == {"iam": 1.0, "k8s": 0.5}
+        assert sorted(manifest["files"]) == [iam_file, os.path.join("k8s", "main.tf")]
+        assert manifest["files"][iam_file] == previous["files"][iam_file]
+        assert manifest["files"][os.path.join("k8s", "main.tf")]["range"] == "files"
+
+        monkeypatch.setattr(repo, "EZTF_INCREMENTAL", False)
+        manifest = repo.output_manifest(
+            str(output_folder), sources, {"iam": 0.2, "k8s": 0.5}, {"iam", "k8s"}
+        )
+        assert manifest["stack_seconds"] == {"iam": 0.2, "k8s": 0.5}
+        assert manifest["files"][iam_file]["md5"] != "kept"
+
+
+class TestSyncOutput:
+
+    def config(self, doc):
+        return {
+            "variable": {"domain": "example.com"},
+            "files": [{"eztf_filename": "a.yaml", "a": 1}],
+            "docs": [{"eztf_filename": "d.md", "content": doc}],
+            "eztf": {
+                "stacks": {
+                    "k8s": [{"files": "yaml"}],
+                    "docs": [{"docs": "anyfile"}],
+                }
+            },
+        }
+
+    def test_sync_with_gcs_sync(self, monkeypatch, tmp_path, capsys):
+        from util_test import FakeBucket, FakeClient
+
+        monkeypatch.chdir(repo.GENERATOR_DIR)
+        bucket = FakeBucket()
+        monkeypatch.setattr(repo.util, "storage_client", lambda: FakeClient(bucket))
+        monkeypatch.setattr(repo, "SSM_HOST", None)
+        monkeypatch.setattr(repo, "EZTF_SYNC_OUTPUT", True)
+        monkeypatch.setattr(repo, "EZTF_GCS_SYNC", True)
+        monkeypatch.setattr(repo, "EZTF_INCREMENTAL", False)
+
+        def generate(doc):
+            bucket.uploads = []
+            details = repo.main(self.config(doc), {}, None, "b", None, str(tmp_path))
+            return details["output_folder"], capsys.readouterr().out
+
+        output_folder, _ = generate("v1")
+        assert sorted(bucket.uploads) == ["README.md", "docs/d.md", "k8s/a.yaml"]
+        k8s_file = os.path.join(output_folder, "k8s", "a.yaml")
+        os.utime(k8s_file, (1, 1))
+
+        # unchanged stacks are rendered again, only changed files are uploaded
+        _, output = generate("v2")
+        assert "Created files: a.yaml in" in output
+        assert bucket.uploads == ["docs/d.md"]
+        assert os.stat(k8s_file).st_mtime == 1
+
+        # incremental skips rendering unchanged stacks, their blobs are kept
+        monkeypatch.setattr(repo, "EZTF_INCREMENTAL", True)
+        _, output = generate("v3")
+        assert "Generating stacks: docs" in output
+        assert "Created files: a.yaml in" not in output
+        assert bucket.uploads == ["docs/d.md"]
+        assert os.stat(k8s_file).st_mtime == 1
+        assert sorted(bucket.blobs) == [
+            f"eztf-output/{os.path.basename(output_folder)}/latest/{name}"
+            for name in [".eztf-manifest.json", "README.md", "docs/d.md", "k8s/a.yaml"]
+        ]
+        assert not os.path.exists(repo.staging_folder(output_folder))
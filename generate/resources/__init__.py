@@ -13,6 +13,8 @@
 # limitations under the License.
 
 import re
+import functools
+import importlib
 from typing import Any
 from constructs import Construct
 from cdktf import (
@@ -20,178 +22,111 @@ from cdktf import (
     TerraformVariable,
     GcsBackend,
 )
-from cdktf_cdktf_provider_google.provider import GoogleProvider
 import util
-from ._users import generate_users
-from ._group import generate_groups, generate_ff_groups
-from ._org import generate_ff_orgs
-from ._wif import (
-    generate_wif_pool,
-    generate_wi_pool,
-    generate_wif_pool_provider,
-    generate_wi_pool_provider,
-)
-from ._sa import generate_sa, generate_ff_iam_sa
-from ._myfolders import generate_folders, generate_ff_folders
-from ._projects import generate_projects, generate_svc_projects, generate_ff_projects
-from ._iam import generate_iam, generate_iam_member
-from ._api import generate_project_services
-from ._network import (
-    generate_networks,
-    generate_peerings,
-    generate_firewalls,
-    generate_routers,
-    add_subnets,
-    generate_fw_policy_nw,
-    generate_fw_policy_rh,
-    generate_ff_network,
-    generate_ff_vpc_firewall,
-    generate_ff_firewall_policy,
-)
-from ._networking import (
-    generate_ff_swp,
-    generate_ff_dns,
-    generate_ff_dnspo,
-    generate_ff_addr,
-    generate_ff_nat,
-)
-from ._logging import (
-    generate_logging,
-    generate_log_destination,
-    generate_logsink,
-    add_dest_sink_map,
-    generate_ff_logbucket,
-)
-from ._monitoring import generate_monitoring
-from ._org_policy import generate_org_policies, generate_custom_org_policies
-
-from ._pubsub import generate_ff_pubsub
-from ._gke import generate_gke
-from ._mydata import data_google_org
-from ._kms import generate_kms, generate_ff_kms
-from ._gcs import generate_gcs, generate_ff_gcs
-from ._vpn import (
-    generate_vpn,
-    generate_vpn_ha,
-    generate_external_vpn_gateways,
-    generate_ff_vpn_ha,
-)
-from ._vm import (
-    generate_compute_disk,
-    generate_compute_instances,
-    generate_instance_from_template,
-    generate_instance_template,
-    generate_mig,
-    generate_umig,
-    generate_ff_vm,
-)
-from ._database import generate_cloudsql
-from ._bigquery import (
-    generate_bigquery_dataset,
-    generate_bigquery_table,
-    generate_bigquery_routine,
-)
-from ._vpcsc import (
-    generate_sc_policy,
-    generate_sc_access_level,
-    generate_sc_perimeter,
-    generate_sc_perimeter_bridge,
-)
-from ._certificate import generate_ff_cas, generate_ff_cm
-from ._parallelstore import generate_parallelstore
-from ._any_module import generate_any_module
-from ._any_data import generate_any_data
-from ._any_resource import generate_any_resource
+import profiling
+
+
+def _lazy(module_name, function_name):
+    """returns generator which imports its module, and the provider bindings
+    it uses, on first call only"""
+
+    def generator(*args, **kwargs):
+        module = importlib.import_module(f".{module_name}", __name__)
+        return getattr(module, function_name)(*args, **kwargs)
+
+    generator.module_name = module_name
+    generator.function_name = function_name
+    return generator
 
 
 creation = {
-    "users": generate_users,
-    "groups": generate_groups,
-    "ff_groups": generate_ff_groups,
-    "ff_orgs": generate_ff_orgs,
-    "wif_pool": generate_wif_pool,
-    "wi_pool": generate_wi_pool,
-    "wif_pool_provider": generate_wif_pool_provider,
-    "wi_pool_provider": generate_wi_pool_provider,
-    "folders": generate_folders,
-    "projects": generate_projects,
-    "ff_folders": generate_ff_folders,
-    "ff_projects": generate_ff_projects,
-    "iam": generate_iam,
-    "iam_member": generate_iam_member,
-    "service_account": generate_sa,
-    "ff_iam_sa": generate_ff_iam_sa,
-    "project_api": generate_project_services,
-    "network": generate_networks,
-    "ff_network": generate_ff_network,
-    "ff_vpc_firewall": generate_ff_vpc_firewall,
-    "ff_firewall_policy": generate_ff_firewall_policy,
-    "firewall": generate_firewalls,
-    "firewall_policy_nw": generate_fw_policy_nw,
-    "firewall_policy_rh": generate_fw_policy_rh,
-    "ff_swp": generate_ff_swp,
-    "ff_dns": generate_ff_dns,
-    "ff_dnspo": generate_ff_dnspo,
-    "ff_addr": generate_ff_addr,
-    "ff_nat": generate_ff_nat,
-    "_svc_projects": generate_svc_projects,
-    "peering": generate_peerings,
-    "router": generate_routers,
-    "logging": generate_logging,
-    "logsink": generate_logsink,
-    "logpubsub": generate_log_destination,
-    "logstorage": generate_log_destination,
-    "logbucket": generate_log_destination,
-    "logbigquery": generate_log_destination,
-    "logproject": generate_log_destination,
-    "ff_logbucket": generate_ff_logbucket,
-    "monitoring": generate_monitoring,
-    "pubsub": generate_ff_pubsub,
-    "org_policy": generate_org_policies,
-    "org_node_policy": generate_org_policies,
-    "custom_org_policy": generate_custom_org_policies,
-    "external_vpn_gateway": generate_external_vpn_gateways,
-    "vpn": generate_vpn,
-    "vpn_ha": generate_vpn_ha,
-    "ff_vpn_ha": generate_ff_vpn_ha,
-    "gke": generate_gke,
-    "gke_private": generate_gke,
-    "gke_autopilot": generate_gke,
-    "gke_autopilot_private": generate_gke,
-    "kms": generate_kms,
-    "ff_kms": generate_ff_kms,
-    "ff_cas": generate_ff_cas,
-    "ff_cm": generate_ff_cm,
-    "sc_policy": generate_sc_policy,
-    "sc_access_level": generate_sc_access_level,
-    "sc_perimeter": generate_sc_perimeter,
-    "sc_perimeter_bridge": generate_sc_perimeter_bridge,
-    "gcs": generate_gcs,
-    "ff_gcs": generate_ff_gcs,
-    "cloudsql": generate_cloudsql,
-    "pgsql": generate_cloudsql,
-    "mysql": generate_cloudsql,
-    "mssql": generate_cloudsql,
-    "vm": generate_compute_instances,
-    "vm_template": generate_instance_template,
-    "vm_from_template": generate_instance_from_template,
-    "ff_vm": generate_ff_vm,
-    "mig": generate_mig,
-    "umig": generate_umig,
-    "disk": generate_compute_disk,
-    "bq_dataset": generate_bigquery_dataset,
-    "bq_table": generate_bigquery_table,
-    "bq_routine": generate_bigquery_routine,
-    "any_module": generate_any_module,
-    "mod": generate_any_module,
-    "any_resource": generate_any_resource,
-    "res": generate_any_resource,
-    "any_data": generate_any_data,
-    "data": generate_any_data,
-    "parallelstore": generate_parallelstore,
+    "users": _lazy("_users", "generate_users"),
+    "groups": _lazy("_group", "generate_groups"),
+    "ff_groups": _lazy("_group", "generate_ff_groups"),
+    "ff_orgs": _lazy("_org", "generate_ff_orgs"),
+    "wif_pool": _lazy("_wif", "generate_wif_pool"),
+    "wi_pool": _lazy("_wif", "generate_wi_pool"),
+    "wif_pool_provider": _lazy("_wif", "generate_wif_pool_provider"),
+    "wi_pool_provider": _lazy("_wif", "generate_wi_pool_provider"),
+    "folders": _lazy("_myfolders", "generate_folders"),
+    "projects": _lazy("_projects", "generate_projects"),
+    "ff_folders": _lazy("_myfolders", "generate_ff_folders"),
+    "ff_projects": _lazy("_projects", "generate_ff_projects"),
+    "iam": _lazy("_iam", "generate_iam"),
+    "iam_member": _lazy("_iam", "generate_iam_member"),
+    "service_account": _lazy("_sa", "generate_sa"),
+    "ff_iam_sa": _lazy("_sa", "generate_ff_iam_sa"),
+    "project_api": _lazy("_api", "generate_project_services"),
+    "network": _lazy("_network", "generate_networks"),
+    "ff_network": _lazy("_network", "generate_ff_network"),
+    "ff_vpc_firewall": _lazy("_network", "generate_ff_vpc_firewall"),
+    "ff_firewall_policy": _lazy("_network", "generate_ff_firewall_policy"),
+    "firewall": _lazy("_network", "generate_firewalls"),
+    "firewall_policy_nw": _lazy("_network", "generate_fw_policy_nw"),
+    "firewall_policy_rh": _lazy("_network", "generate_fw_policy_rh"),
+    "ff_swp": _lazy("_networking", "generate_ff_swp"),
+    "ff_dns": _lazy("_networking", "generate_ff_dns"),
+    "ff_dnspo": _lazy("_networking", "generate_ff_dnspo"),
+    "ff_addr": _lazy("_networking", "generate_ff_addr"),
+    "ff_nat": _lazy("_networking", "generate_ff_nat"),
+    "_svc_projects": _lazy("_projects", "generate_svc_projects"),
+    "peering": _lazy("_network", "generate_peerings"),
+    "router": _lazy("_network", "generate_routers"),
+    "logging": _lazy("_logging", "generate_logging"),
+    "logsink": _lazy("_logging", "generate_logsink"),
+    "logpubsub": _lazy("_logging", "generate_log_destination"),
+    "logstorage": _lazy("_logging", "generate_log_destination"),
+    "logbucket": _lazy("_logging", "generate_log_destination"),
+    "logbigquery": _lazy("_logging", "generate_log_destination"),
+    "logproject": _lazy("_logging", "generate_log_destination"),
+    "ff_logbucket": _lazy("_logging", "generate_ff_logbucket"),
+    "monitoring": _lazy("_monitoring", "generate_monitoring"),
+    "pubsub": _lazy("_pubsub", "generate_ff_pubsub"),
+    "org_policy": _lazy("_org_policy", "generate_org_policies"),
+    "org_node_policy": _lazy("_org_policy", "generate_org_policies"),
+    "custom_org_policy": _lazy("_org_policy", "generate_custom_org_policies"),
+    "external_vpn_gateway": _lazy("_vpn", "generate_external_vpn_gateways"),
+    "vpn": _lazy("_vpn", "generate_vpn"),
+    "vpn_ha": _lazy("_vpn", "generate_vpn_ha"),
+    "ff_vpn_ha": _lazy("_vpn", "generate_ff_vpn_ha"),
+    "gke": _lazy("_gke", "generate_gke"),
+    "gke_private": _lazy("_gke", "generate_gke"),
+    "gke_autopilot": _lazy("_gke", "generate_gke"),
+    "gke_autopilot_private": _lazy("_gke", "generate_gke"),
+    "kms": _lazy("_kms", "generate_kms"),
+    "ff_kms": _lazy("_kms", "generate_ff_kms"),
+    "ff_cas": _lazy("_certificate", "generate_ff_cas"),
+    "ff_cm": _lazy("_certificate", "generate_ff_cm"),
+    "sc_policy": _lazy("_vpcsc", "generate_sc_policy"),
+    "sc_access_level": _lazy("_vpcsc", "generate_sc_access_level"),
+    "sc_perimeter": _lazy("_vpcsc", "generate_sc_perimeter"),
+    "sc_perimeter_bridge": _lazy("_vpcsc", "generate_sc_perimeter_bridge"),
+    "gcs": _lazy("_gcs", "generate_gcs"),
+    "ff_gcs": _lazy("_gcs", "generate_ff_gcs"),
+    "cloudsql": _lazy("_database", "generate_cloudsql"),
+    "pgsql": _lazy("_database", "generate_cloudsql"),
+    "mysql": _lazy("_database", "generate_cloudsql"),
+    "mssql": _lazy("_database", "generate_cloudsql"),
+    "vm": _lazy("_vm", "generate_compute_instances"),
+    "vm_template": _lazy("_vm", "generate_instance_template"),
+    "vm_from_template": _lazy("_vm", "generate_instance_from_template"),
+    "ff_vm": _lazy("_vm", "generate_ff_vm"),
+    "mig": _lazy("_vm", "generate_mig"),
+    "umig": _lazy("_vm", "generate_umig"),
+    "disk": _lazy("_vm", "generate_compute_disk"),
+    "bq_dataset": _lazy("_bigquery", "generate_bigquery_dataset"),
+    "bq_table": _lazy("_bigquery", "generate_bigquery_table"),
+    "bq_routine": _lazy("_bigquery", "generate_bigquery_routine"),
+    "any_module": _lazy("_any_module", "generate_any_module"),
+    "mod": _lazy("_any_module", "generate_any_module"),
+    "any_resource": _lazy("_any_resource", "generate_any_resource"),
+    "res": _lazy("_any_resource", "generate_any_resource"),
+    "any_data": _lazy("_any_data", "generate_any_data"),
+    "data": _lazy("_any_data", "generate_any_data"),
+    "parallelstore": _lazy("_parallelstore", "generate_parallelstore"),
 }
 
-data_creation = {"google_org": data_google_org}
+data_creation = {"google_org": _lazy("_mydata", "data_google_org")}
 
 variable_creation = {
     "users": ["organization_id", "setup_service_account"],
@@ -207,10 +142,161 @@ variable_creation = {
     "sc_policy": ["organization_id"],
 }
 
-added_ref = {"network": [add_subnets], "logsink": [add_dest_sink_map]}
+added_ref = {
+    "network": [_lazy("_network", "add_subnets")],
+    "ff_network": [_lazy("_network", "add_ff_subnets")],
+    "logsink": [_lazy("_logging", "add_dest_sink_map")],
+}
 
 sentinel = object()
 
+# tf_ref type to created resource type and its output attribute,
+# generators extend it when they register a resource which can be referred
+ref_attribute = {
+    "user": ("users", "primary_email"),
+    "group": ("groups", "id_output"),
+    "group_name": ("groups", "name_output"),
+    "service_account": ("service_account", "email"),
+    "serviceaccount": ("service_account", "email"),
+    "network": ("network", "network_self_link_output"),
+    "network_name": ("network", "network_name_output"),
+    "network_id": ("network", "network_id_output"),
+    "project": ("projects", "project_id_output"),
+    "project_number": ("projects", "project_number_output"),
+    "folder": ("folders", "name"),
+    "folder_id": ("folders", "folder_id"),
+    "external_vpn_gateway": ("external_vpn_gateway", "self_link"),
+    "sc_policy": ("sc_policy", "name"),
+    "sc_access_level_name": ("sc_access_level", "name_output"),
+    "custom_org_policy": ("custom_org_policy", "name"),
+    "log_destination": ("log_destination", "destination_uri_output"),
+    "vm_template": ("vm_template", "self_link_unique_output"),
+    "disk": ("disk", "self_link"),
+    "bq_dataset": ("bq_dataset", "dataset_id"),
+    "bq_table": ("bq_table", "table_id"),
+    "bq_routine": ("bq_routine", "routine_id"),
+    "wif_pool": ("wif_pool", "workforce_pool_id"),
+    "wi_pool": ("wi_pool", "workload_identity_pool_id"),
+    "cx": ("cx", "id"),
+    "datastore": ("datastore", "data_store_id"),
+    "ai_index": ("ai_index", "id"),
+    "ai_index_endpoint": ("ai_index_endpoint", "id"),
+}
+
+
+def _ref_billing(stack, name, default):
+    if name:
+        return default
+    stack.ensure_variables(["billing_id"])
+    return stack.created["vars"]["billing_id"].string_value
+
+
+def _ref_customer_id(stack, name, default):
+    if name:
+        return default
+    if google_org := stack.created.get("data", {}).get("google_org"):
+        return google_org.directory_customer_id
+    stack.ensure_variables(["customer_id"])
+    return stack.created["vars"]["customer_id"].string_value
+
+
+def _ref_organization(stack, name, default):
+    stack.ensure_variables(["organization_id"])
+    return stack.created["vars"]["organization_id"].string_value
+
+
+def _ref_projects_number(stack, name, default):
+    if project := stack.created.get("projects", {}).get(name):
+        return f"projects/{project.project_number_output}"
+    return default
+
+
+_subnet_link = re.compile(r"projects/(.+)/regions/(.+)/subnetworks/(.+)")
+
+
+def _ref_subnet(stack, name, default):
+    index = stack.added.get("subnet_index", {})
+    if ref := index.get(name):
+        return ref
+    prj, region, subnet = stack._re_prj_region_subnet(name)
+    if ref := index.get(f"{prj}/{region}/{subnet}") or index.get(
+        f"{region}/{subnet}"
+    ):
+        return ref
+    elif region and subnet:
+        prj = prj or "${var.nw_project_id}"
+        return f"projects/{prj}/regions/{region}/subnetworks/{subnet}"
+    return default
+
+
+def _ref_vpn_ha(stack, name, default):
+    if name in stack.added.get("vpn_ha", set()):
+        return f"${{module.vpn_ha_{name}.self_link}}"
+    return default
+
+
+# tf_ref types which are not a plain output attribute of a created resource
+ref_function = {
+    "billing": _ref_billing,
+    "billing_account": _ref_billing,
+    "customer_id": _ref_customer_id,
+    "organization": _ref_organization,
+    "projects/number": _ref_projects_number,
+    "subnet": _ref_subnet,
+    "vpn_ha": _ref_vpn_ha,
+}
+
+
+@functools.lru_cache(maxsize=512)
+def provider_class(provider, res_name, nested_params=()):
+    """returns provider binding class of a resource or of its nested struct,
+    nested structs are in the module of their resource"""
+    module = importlib.import_module(f"cdktf_cdktf_provider_{provider}.{res_name}")
+    return getattr(module, util.pascal_case("_".join((res_name, *nested_params))))
+
+
+def load_provider_classes(eztf_details):
+    "looks up provider classes of any resource and any data ranges ahead of use"
+    lookups = [
+        (name.split("_")[0], "_".join(name.split("_")[1:]))
+        for name in (
+            details.get("name")
+            for details in eztf_details.get("tf_any_resource", {}).values()
+        )
+        if name
+    ]
+    lookups += [
+        (name.split("_")[0], f"data_{name}")
+        for name in (
+            details.get("name")
+            for details in eztf_details.get("tf_any_data", {}).values()
+        )
+        if name
+    ]
+    for provider, res_name in lookups:
+        try:
+            # same arguments as resource_function, to share its cache entry
+            provider_class(provider, res_name, ())
+        except (ImportError, AttributeError):
+            # reported by the range generator when it is used
+            pass
+
+
+def load_generators(resource_types=None):
+    """imports generator modules of resource types, all when not provided,
+    returns import error by module name"""
+    if resource_types is None:
+        generators = list(creation.values()) + list(data_creation.values())
+    else:
+        generators = [creation[res] for res in resource_types if res in creation]
+    failed = {}
+    for module_name in sorted({generator.module_name for generator in generators}):
+        try:
+            importlib.import_module(f".{module_name}", __name__)
+        except ImportError as err:
+            failed[module_name] = err
+    return failed
+
 
 class MyStack(TerraformStack):
     """Creates GCP tf"""
@@ -259,17 +345,28 @@ class MyStack(TerraformStack):
                 if variable_creation.get(resource):
                     self.ensure_variables(variable_creation[resource])
 
+        load_provider_classes(self.eztf_config.get("eztf", {}))
         for range_resource in eztf_range_resources:
             for my_resource, resource in range_resource.items():
                 if creation.get(resource):
                     self.file_seprator_variable(my_resource)
-                    creation[resource](self, my_resource, resource)
+                    with profiling.phase(
+                        "resource",
+                        self,
+                        stack=sub_stack_name,
+                        resource=resource,
+                        range=my_resource,
+                    ):
+                        creation[resource](self, my_resource, resource)
 
     def file_seprator_variable(self, name, force=False):
         if self.eztf_config.get(name) or force:
             TerraformVariable(self, f"{util.RANDOM_WORD}file_{name}")
 
     def _create_backend(self, config_sub_type):
+        # google provider assembly is loaded only once a stack is created
+        from cdktf_cdktf_provider_google.provider import GoogleProvider
+
         var = self.eztf_config.get("variable", {})
 
         GoogleProvider(self, id="google", project=var.get("setup_project_id"))
@@ -306,10 +403,17 @@ class MyStack(TerraformStack):
         ref_p_id = self.tf_ref(p_type.lower(), p_id)
         return f"{p_type}:{ref_p_id}"
 
+    def index_subnet(self, project, region, subnet, ref):
+        """adds reference of a subnet to the network index of the stack,
+        keyed by subnet link, project/region/subnet and region/subnet"""
+        index = self.added.setdefault("subnet_index", {})
+        index[f"projects/{project}/regions/{region}/subnetworks/{subnet}"] = ref
+        index[f"{project}/{region}/{subnet}"] = ref
+        index[f"{region}/{subnet}"] = ref
+
     def _re_prj_region_subnet(self, subnet_link):
-        pattern = r"projects/(.+)/regions/(.+)/subnetworks/(.+)"
         sub_li = subnet_link.split("/")
-        if match := re.search(pattern, subnet_link):
+        if match := _subnet_link.search(subnet_link):
             return match.group(1), match.group(2), match.group(3)
         elif len(sub_li) == 3:
             return sub_li[0], sub_li[1], sub_li[2]
@@ -360,13 +464,10 @@ class MyStack(TerraformStack):
         if not provider:
             provider = resource.split("_")[0]
             res_name = "_".join(resource.split("_")[1:])
+        nested_params = tuple(nested_params or ())
+        func = provider_class(provider, res_name, nested_params)
         if nested_params:
-            res_name = "_".join([res_name] + nested_params)
-        method_name = util.pascal_case(res_name)
-        module = __import__(
-            f"cdktf_cdktf_provider_{provider}.{res_name}", fromlist=[res_name]
-        )
-        func = getattr(module, method_name)
+            res_name = "_".join((res_name, *nested_params))
         return func, res_name
 
     def tf_param_list(self, data, key, attribute_object_func):
@@ -377,90 +478,18 @@ class MyStack(TerraformStack):
         attribute_func, _ = self.resource_function(
             resource, nested_params, provider="google"
         )
-        self.tf_param_list(self, data, nested_params[-1], attribute_func)
+        self.tf_param_list(data, nested_params[-1], attribute_func)
 
-    # fmt: off
     def tf_ref(self, res_type, name, default=sentinel):
+        """returns reference of a created resource output by ref type,
+        default when the resource is not created in the stack"""
         if default is sentinel:
             default = name
-        refname = default
-        if (res_type == "billing" or res_type == "billing_account") and not name:
-            self.ensure_variables(["billing_id"])
-            refname = self.created["vars"]["billing_id"].string_value
-        if res_type == "customer_id" and not name:
-            if self.created.get("data", {}).get("google_org"):
-                refname = self.created["data"]["google_org"].directory_customer_id
-            else:
-                self.ensure_variables(["customer_id"])
-                refname = self.created["vars"]["customer_id"].string_value
-        if res_type == "user" and self.created.get("users", {}).get(name):
-            refname = self.created["users"][name].primary_email
-        if res_type == "group" and self.created.get("groups", {}).get(name):
-            refname = self.created["groups"][name].id_output
-        if res_type == "group_name" and self.created.get("groups", {}).get(name):
-            refname = self.created["groups"][name].name_output
-        if (res_type == "service_account" or res_type == "serviceaccount") and self.created.get("service_account", {}).get(name):
-            refname = self.created["service_account"][name].email
-        elif res_type == "network" and self.created.get("network", {}).get(name):
-            refname = self.created["network"][name].network_self_link_output
-        elif res_type == "network_name" and self.created.get("network", {}).get(name):
-            refname = self.created["network"][name].network_name_output
-        elif res_type == "network_id" and self.created.get("network", {}).get(name):
-            refname = self.created["network"][name].network_id_output
-        elif res_type == "project" and self.created.get("projects", {}).get(name):
-            refname = self.created["projects"][name].project_id_output
-        elif res_type == "project_number" and self.created.get("projects", {}).get(name):
-            refname = self.created["projects"][name].project_number_output
-        elif res_type == "projects/number" and self.created.get("projects", {}).get(name):
-            refname = f'projects/{self.created["projects"][name].project_number_output}'
-        elif res_type == "organization":
-            self.ensure_variables(["organization_id"])
-            refname = self.created["vars"]["organization_id"].string_value
-        elif res_type == "folder" and self.created.get("folders", {}).get(name):
-            refname = self.created["folders"][name].name
-        elif res_type == "folder_id" and self.created.get("folders", {}).get(name):
-            refname = self.created["folders"][name].folder_id
-        elif res_type == "subnet":
-            prj, region, subnet = self._re_prj_region_subnet(name)
-            region_subnet = f"{region}/{subnet}"
-            if vpc_name := self.added.get("subnets", {}).get(region_subnet):
-                refname = f'${{module.nw_{vpc_name}.subnets["{region_subnet}"].self_link}}'
-            elif region and subnet:
-                prj = prj or '${var.nw_project_id}'
-                refname = f"projects/{prj}/regions/{region}/subnetworks/{subnet}"
-        elif res_type == "vpn_ha" and name in self.added.get("vpn_ha", set()):
-            refname = f"${{module.vpn_ha_{name}.self_link}}"
-        elif res_type == "external_vpn_gateway" and self.created.get("external_vpn_gateway", {}).get(name):
-            refname = self.created["external_vpn_gateway"][name].self_link
-        elif res_type == "sc_policy" and self.created.get("sc_policy", {}).get(name):
-            refname = self.created["sc_policy"][name].name
-        elif res_type == "sc_access_level_name" and self.created.get("sc_access_level", {}).get(name):
-            refname = self.created["sc_access_level"][name].name_output
-        elif res_type == "custom_org_policy" and self.created.get("custom_org_policy", {}).get(name):
-            refname = self.created["custom_org_policy"][name].name
-        elif res_type == "log_destination" and self.created.get(res_type, {}).get(name):
-            refname = self.created[res_type][name].destination_uri_output
-        if res_type == "vm_template" and self.created.get("vm_template", {}).get(name):
-            refname = self.created["vm_template"][name].self_link_unique_output
-        if res_type == "disk" and self.created.get("disk", {}).get(name):
-            refname = self.created["disk"][name].self_link
-        if res_type == "bq_dataset" and self.created.get("bq_dataset", {}).get(name):
-            refname = self.created["bq_dataset"][name].dataset_id
-        if res_type == "bq_table" and self.created.get("bq_table", {}).get(name):
-            refname = self.created["bq_table"][name].table_id
-        if res_type == "bq_routine" and self.created.get("bq_routine", {}).get(name):
-            refname = self.created["bq_routine"][name].routine_id
-        if res_type == "wif_pool" and self.created.get("wif_pool", {}).get(name):
-            refname = self.created["wif_pool"][name].workforce_pool_id
-        if res_type == "wi_pool" and self.created.get("wi_pool", {}).get(name):
-            refname = self.created["wi_pool"][name].workload_identity_pool_id
-        if res_type == "cx" and self.created.get("cx", {}).get(name):
-            refname = self.created["cx"][name].id
-        if res_type == "datastore" and self.created.get("datastore", {}).get(name):
-            refname = self.created["datastore"][name].data_store_id
-        if res_type == "ai_index" and self.created.get("ai_index", {}).get(name):
-            refname = self.created["ai_index"][name].id
-        if res_type == "ai_index_endpoint" and self.created.get("ai_index_endpoint", {}).get(name):
-            refname = self.created["ai_index_endpoint"][name].id
-        return refname
-    # fmt: on
+        if ref := ref_attribute.get(res_type):
+            created_type, attribute = ref
+            if created := self.created.get(created_type, {}).get(name):
+                return getattr(created, attribute)
+            return default
+        if ref_func := ref_function.get(res_type):
+            return ref_func(self, name, default)
+        return default
@@ -16,18 +16,16 @@
 import util
 
 
-def data_function(name: str):
+def data_function(self, name: str):
     provider = name.split("_")[0]
-    method_name = util.pascal_case(f"data_{name}")
-    module = __import__(f"cdktf_cdktf_provider_{provider}.data_{name}")
-    func = getattr(module, method_name)
+    func, _ = self.resource_function(f"data_{name}", provider=provider)
     return func
 
 
 def create_any_data(self, data_name: str, data: dict):
     data_id = data.get("_eztf_data_id", util.random_str(n=5))
     del data["_eztf_data_id"]
-    func = data_function(data_name)
+    func = data_function(self, data_name)
     self.created["data"][data_name][data_id] = func(self, **data)
 
 
@@ -146,11 +146,12 @@ def generate_routers(self, my_resource, resource):
 
 
 def add_subnets(self, my_resource, resource):
-    self.added["subnets"] = self.added.get("subnets", {})
     for vpc in self.eztf_config.get(my_resource, []):
+        vpc_name = vpc["network_name"]
         for sub in vpc.get("subnets", []):
             region, subnet = sub["subnet_region"], sub["subnet_name"]
-            self.added["subnets"][f"{region}/{subnet}"] = vpc["network_name"]
+            ref = f'${{module.nw_{vpc_name}.subnets["{region}/{subnet}"].self_link}}'
+            self.index_subnet(vpc["project_id"], region, subnet, ref)
 
 
 def generate_fw_policy_rh(self, my_resource, resource):
@@ -211,6 +212,16 @@ def create_ff_firewall_policy(self, fw):
     )
 
 
+def add_ff_subnets(self, my_resource, resource):
+    for vpc in self.eztf_config.get(my_resource, []):
+        vpc_name = vpc["name"]
+        for output in ["subnets", "subnets_proxy_only", "subnets_psc"]:
+            for sub in vpc.get(output) or []:
+                region, subnet = sub["region"], sub["name"]
+                ref = f'${{module.net_{vpc_name}.{output}["{region}/{subnet}"].self_link}}'
+                self.index_subnet(vpc["project_id"], region, subnet, ref)
+
+
 def generate_ff_network(self, my_resource, resource):
     for vpc in self.eztf_config.get(my_resource, []):
         create_ff_network(self, vpc)
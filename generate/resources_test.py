@@ -0,0 +1,152 @@
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import ast
+import os
+import subprocess
+import sys
+import pytest
+
+pytest.importorskip("cdktf")
+
+from benchmark import RefOutput, RefStack
+
+GENERATE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def module_functions(module_name):
+    "returns top level function names of a resources module without importing it"
+    with open(
+        os.path.join(GENERATE_DIR, "resources", f"{module_name}.py"), encoding="utf-8"
+    ) as fp:
+        tree = ast.parse(fp.read())
+    return {node.name for node in tree.body if isinstance(node, ast.FunctionDef)}
+
+
+class TestResources:
+
+    def test_import_is_lazy(self):
+        script = (
+            "import sys, resources\n"
+            "print(','.join(m for m in sys.modules "
+            "if m.startswith(('resources._', 'imports', 'cdktf_cdktf_provider_'))))"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", script],
+            cwd=GENERATE_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        assert result.stdout.strip() == ""
+
+    def test_lazy_generators_exist(self):
+        from resources import creation, data_creation, added_ref
+
+        generators = list(creation.values()) + list(data_creation.values())
+        for add_refs in added_ref.values():
+            generators.extend(add_refs)
+        for generator in generators:
+            assert generator.function_name in module_functions(generator.module_name)
+
+    def test_tf_ref_table(self):
+        stack = RefStack(1)
+        expected = {
+            ("user", "users-0"): "${users.0.primary_email}",
+            ("group", "groups-0"): "${groups.0.id_output}",
+            ("group_name", "groups-0"): "${groups.0.name_output}",
+            ("service_account", "service_account-0"): "${service_account.0.email}",
+            ("serviceaccount", "service_account-0"): "${service_account.0.email}",
+            ("network", "network-0"): "${network.0.network_self_link_output}",
+            ("network_name", "network-0"): "${network.0.network_name_output}",
+            ("network_id", "network-0"): "${network.0.network_id_output}",
+            ("project", "projects-0"): "${projects.0.project_id_output}",
+            ("project_number", "projects-0"): "${projects.0.project_number_output}",
+            ("projects/number", "projects-0"): (
+                "projects/${projects.0.project_number_output}"
+            ),
+            ("folder", "folders-0"): "${folders.0.name}",
+            ("folder_id", "folders-0"): "${folders.0.folder_id}",
+            ("bq_dataset", "bq_dataset-0"): "${bq_dataset.0.dataset_id}",
+            ("organization", "/"): "${var.organization_id.string_value}",
+            ("billing", ""): "${var.billing_id.string_value}",
+            ("billing_account", ""): "${var.billing_id.string_value}",
+            ("billing", "b-1"): "b-1",
+            ("customer_id", ""): "${var.customer_id.string_value}",
+            ("customer_id", "C01"): "C01",
+            ("vpn_ha", "vpn-0"): "${module.vpn_ha_vpn-0.self_link}",
+            ("vpn_ha", "vpn-1"): "vpn-1",
+            # not created in the stack, or not a ref type
+            ("project", "projects-1"): "projects-1",
+            ("projects/number", "projects-1"): "projects-1",
+            ("user", "users-1"): "users-1",
+            ("x", "y"): "y",
+        }
+        for (res_type, name), ref in expected.items():
+            assert stack.tf_ref(res_type, name) == ref, (res_type, name)
+        assert stack.tf_ref("project", "missing", None) is None
+        assert sorted(stack.created["vars"]) == [
+            "billing_id",
+            "customer_id",
+            "organization_id",
+        ]
+
+        stack.created["data"]["google_org"] = RefOutput("data.google_org")
+        assert stack.tf_ref("customer_id", "") == (
+            "${data.google_org.directory_customer_id}"
+        )
+
+    def test_subnet_index(self):
+        stack = RefStack(1)
+        stack.index_subnet("prj-a", "us-east1", "sub", "${module.net_a.subnets.x}")
+        stack.index_subnet("prj-b", "us-east1", "sub", "${module.net_b.subnets.x}")
+        assert stack.tf_ref("subnet", "prj-a/us-east1/sub") == (
+            "${module.net_a.subnets.x}"
+        )
+        link = "https://www.googleapis.com/compute/v1/projects/prj-a/regions/us-east1/subnetworks/sub"
+        assert stack.tf_ref("subnet", link) == "${module.net_a.subnets.x}"
+        assert stack.tf_ref("subnet", "us-east1/sub") == "${module.net_b.subnets.x}"
+        assert stack.tf_ref("subnet", "prj-c/us-west1/sub") == (
+            "projects/prj-c/regions/us-west1/subnetworks/sub"
+        )
+        assert stack.tf_ref("subnet", "us-west1/sub") == (
+            "projects/${var.nw_project_id}/regions/us-west1/subnetworks/sub"
+        )
+        assert stack.tf_ref("subnet", "sub") == "sub"
+
+    def test_provider_class_cached(self):
+        from resources import MyStack, provider_class, load_provider_classes
+        from resources._any_data import data_function
+
+        provider_class.cache_clear()
+        stack = object.__new__(MyStack)
+        load_provider_classes(
+            {
+                "tf_any_resource": {"buckets": {"name": "google_storage_bucket"}},
+                "tf_any_data": {"nets": {"name": "google_compute_network"}},
+            }
+        )
+        assert provider_class.cache_info().currsize == 2
+
+        func, res_name = stack.resource_function("google_storage_bucket")
+        assert (func.__name__, res_name) == ("StorageBucket", "storage_bucket")
+        assert data_function(stack, "google_compute_network").__name__ == (
+            "DataGoogleComputeNetwork"
+        )
+        func, res_name = stack.resource_function(
+            "storage_bucket", ["lifecycle_rule"], provider="google"
+        )
+        assert func.__name__ == "StorageBucketLifecycleRule"
+        assert res_name == "storage_bucket_lifecycle_rule"
+        assert provider_class.cache_info().hits == 2
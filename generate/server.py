@@ -0,0 +1,222 @@
+#!/usr/bin/env python
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""long lived generator service, keeps jsii runtime and provider bindings warm
+
+POST / with json body, provide either config, configContent or configFile
+    config           config data as json object
+    configContent    yaml/json config string
+    configFile       local config file or gcs object path with configBucket
+    configBucket     gcs bucket name of configFile
+    outputBucket     gcs bucket name to store code output
+    outputGcsPrefix  gcs prefix to store code output
+    outputDir        local output dir, default EZTF_OUTPUT_DIR
+
+responds with output_gcs, git_uri and repo_url where output is stored and the
+generation log, output_folder only when it is kept (not EZTF_MODE=service).
+the log is stdout of the request, including synth workers and subprocesses.
+tf stacks are derived from the config, as in pipeline.py
+
+constructs of every request stay in the jsii kernel, the process replaces
+itself after EZTF_GENERATE_MAX_REQUESTS requests or above EZTF_GENERATE_MAX_RSS_MB
+of the process and its children, keeping its listening socket
+"""
+
+import os
+import io
+import sys
+import json
+import socket
+import tempfile
+import contextlib
+import importlib
+import traceback
+from http.server import BaseHTTPRequestHandler, HTTPServer
+import yaml
+import util
+import repo
+import pipeline
+from resources import load_generators
+
+GENERATE_HOST = os.environ.get("EZTF_GENERATE_HOST") or "127.0.0.1"
+GENERATE_PORT = int(os.environ.get("EZTF_GENERATE_PORT") or 8090)
+WARM_RESOURCES = os.environ.get("EZTF_WARM_RESOURCES")
+MAX_REQUESTS = int(os.environ.get("EZTF_GENERATE_MAX_REQUESTS") or 20)
+MAX_RSS_MB = int(os.environ.get("EZTF_GENERATE_MAX_RSS_MB") or 4096)
+# listening socket handed over to the replacing process
+LISTEN_FD = os.environ.get("EZTF_GENERATE_LISTEN_FD")
+
+
+def request_config(body):
+    "returns config dict from request body"
+    if body.get("config"):
+        return body["config"]
+    if body.get("configContent"):
+        return yaml.safe_load(body["configContent"])
+    if body.get("configFile"):
+        return pipeline.load_config(body["configFile"], body.get("configBucket"))
+    raise ValueError("Provide either config, configContent or configFile")
+
+
+def generate_request(body):
+    """generates output repository for a request, returns output details,
+    local output folder is deleted in service mode"""
+    details = pipeline.generate(
+        request_config(body),
+        body.get("outputBucket"),
+        body.get("outputGcsPrefix"),
+        body.get("outputDir"),
+    )
+    if repo.EZTF_MODE == "service":
+        util.delete_folders([details.pop("output_folder")])
+    return details
+
+
+@contextlib.contextmanager
+def capture_output(log_file):
+    """writes stdout to log_file while generating, at fd level so output of
+    synth worker processes and subprocesses is captured too"""
+    sys.stdout.flush()
+    saved_fd = os.dup(1)
+    os.dup2(log_file.fileno(), 1)
+    stream = io.open(1, "w", encoding="utf-8", buffering=1, closefd=False)
+    try:
+        with contextlib.redirect_stdout(stream):
+            yield
+    finally:
+        stream.flush()
+        os.dup2(saved_fd, 1)
+        os.close(saved_fd)
+
+
+def read_log(log_file):
+    log_file.seek(0)
+    return log_file.read().decode("utf-8", errors="replace")
+
+
+def process_rss_mb(pid="self"):
+    """returns resident memory of a process and its children, the jsii kernel
+    runs in a node child process. 0 without /proc"""
+    try:
+        with open(f"/proc/{pid}/statm", encoding="utf-8") as fp:
+            rss_mb = int(fp.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+        tasks = os.listdir(f"/proc/{pid}/task")
+    except OSError:
+        return 0
+    for task in tasks:
+        try:
+            with open(f"/proc/{pid}/task/{task}/children", encoding="utf-8") as fp:
+                rss_mb += sum(process_rss_mb(child) for child in fp.read().split())
+        except OSError:
+            pass
+    return rss_mb
+
+
+def recycle_reason(generated):
+    "returns why the process should be replaced, None while within bounds"
+    if MAX_REQUESTS and generated >= MAX_REQUESTS:
+        return f"request limit {MAX_REQUESTS} reached"
+    if MAX_RSS_MB and (rss_mb := process_rss_mb()) > MAX_RSS_MB:
+        return f"{rss_mb:.0f}MB resident"
+    return None
+
+
+class GenerateHandler(BaseHTTPRequestHandler):
+    """handles generate requests one at a time, jsii is single threaded"""
+
+    def send_json(self, status, data):
+        content = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def do_GET(self):
+        self.send_json(200, {"status": "ok"})
+
+    def do_POST(self):
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError as err:
+            self.send_json(400, {"error": f"Invalid request body {err}"})
+            return
+
+        self.server.generated = getattr(self.server, "generated", 0) + 1
+        with tempfile.TemporaryFile() as log_file:
+            try:
+                with capture_output(log_file):
+                    details = generate_request(body)
+            except ValueError as err:
+                self.send_json(400, {"error": str(err), "log": read_log(log_file)})
+                return
+            except Exception as err:
+                traceback.print_exc()
+                self.send_json(
+                    500,
+                    {"error": f"Error Generating {err}", "log": read_log(log_file)},
+                )
+                return
+            self.send_json(200, {**details, "log": read_log(log_file)})
+
+
+def warm_up():
+    "imports provider bindings and generator modules ahead of first request"
+    resource_types = WARM_RESOURCES.split(",") if WARM_RESOURCES else None
+    for module_name, err in load_generators(resource_types).items():
+        print(f"Warning: generator {module_name} not loaded, {err}")
+    # google provider assembly is used by every stack
+    importlib.import_module("cdktf_cdktf_provider_google.provider")
+
+
+def generate_server():
+    "returns server listening on the socket of the replaced process, or a new one"
+    if not LISTEN_FD:
+        return HTTPServer((GENERATE_HOST, GENERATE_PORT), GenerateHandler)
+    server = HTTPServer(
+        (GENERATE_HOST, GENERATE_PORT), GenerateHandler, bind_and_activate=False
+    )
+    server.socket.close()
+    server.socket = socket.socket(fileno=int(LISTEN_FD))
+    return server
+
+
+def serve_until_recycle(server):
+    "handles requests until the process should be replaced, returns the reason"
+    server.generated = 0
+    while True:
+        server.handle_request()
+        if reason := recycle_reason(server.generated):
+            return reason
+
+
+def serve():
+    server = generate_server()
+    warm_up()
+    print(
+        f"ezytf generate service listening on http://{GENERATE_HOST}:{GENERATE_PORT}",
+        flush=True,
+    )
+    reason = serve_until_recycle(server)
+    # requests queue on the socket while the new process warms up
+    print(f"replacing generate service process, {reason}", flush=True)
+    os.set_inheritable(server.socket.fileno(), True)
+    os.environ["EZTF_GENERATE_LISTEN_FD"] = str(server.socket.fileno())
+    os.execv(sys.executable, [sys.executable, *sys.argv])
+
+
+if __name__ == "__main__":
+    serve()
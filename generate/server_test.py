@@ -0,0 +1,172 @@
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import socket
+import subprocess
+import sys
+import threading
+import urllib.error
+import urllib.request
+from http.server import HTTPServer
+import pytest
+import server
+
+
+@pytest.fixture
+def generate_url():
+    httpd = HTTPServer(("127.0.0.1", 0), server.GenerateHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_port}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def post(url, data):
+    request = urllib.request.Request(
+        url, data=data, headers={"Content-Type": "application/json"}
+    )
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as err:
+        return err.code, json.loads(err.read())
+
+
+class TestGenerateService:
+
+    def test_request_config(self, monkeypatch):
+        monkeypatch.setattr(
+            server.pipeline,
+            "load_config",
+            lambda config_file, bucket: {"file": config_file, "bucket": bucket},
+        )
+        assert server.request_config({"config": {"a": 1}}) == {"a": 1}
+        assert server.request_config({"configContent": "a: 1\n"}) == {"a": 1}
+        assert server.request_config(
+            {"configFile": "org.yaml", "configBucket": "b"}
+        ) == {"file": "org.yaml", "bucket": "b"}
+        with pytest.raises(ValueError):
+            server.request_config({})
+
+    def test_generate(self, monkeypatch, tmp_path, generate_url):
+        calls = []
+        output_folder = tmp_path / "gcp-example-com-ezy"
+
+        def generate(config, output_bucket, output_gcs_prefix, output_dir):
+            calls.append((config, output_bucket, output_gcs_prefix, output_dir))
+            output_folder.mkdir()
+            print("Created files: README.md")
+            return {
+                "output_folder": str(output_folder),
+                "output_gcs": f"gs://{output_bucket}/{output_gcs_prefix}",
+            }
+
+        monkeypatch.setattr(server.pipeline, "generate", generate)
+        monkeypatch.setattr(server.repo, "EZTF_MODE", "service")
+        body = {
+            "config": {"variable": {"domain": "example.com"}},
+            "outputBucket": "b",
+            "outputGcsPrefix": "eztf-output/org/latest/",
+            "outputDir": str(tmp_path),
+        }
+        status, result = post(generate_url, json.dumps(body).encode())
+
+        assert status == 200
+        assert result == {
+            "output_gcs": "gs://b/eztf-output/org/latest/",
+            "log": "Created files: README.md\n",
+        }
+        assert calls == [
+            (body["config"], "b", "eztf-output/org/latest/", str(tmp_path))
+        ]
+        assert not output_folder.exists()
+
+    def test_bad_request(self, generate_url):
+        status, result = post(generate_url, b"{not json")
+        assert status == 400 and "Invalid request body" in result["error"]
+        status, result = post(generate_url, b"{}")
+        assert status == 400
+        assert result["error"] == "Provide either config, configContent or configFile"
+
+    def test_generate_error(self, monkeypatch, generate_url):
+        def generate(*args):
+            print("Generating stacks: iam")
+            raise KeyError("variable")
+
+        monkeypatch.setattr(server.pipeline, "generate", generate)
+        status, result = post(generate_url, json.dumps({"config": {"a": 1}}).encode())
+        assert status == 500
+        assert result == {
+            "error": "Error Generating 'variable'",
+            "log": "Generating stacks: iam\n",
+        }
+
+    def test_log_of_subprocesses(self, monkeypatch, generate_url):
+        def generate(*args):
+            print("Generating stacks: iam")
+            subprocess.run(
+                [sys.executable, "-c", "print('Synthesized iam')"], check=True
+            )
+            print("Created files: README.md")
+            return {"output_gcs": None}
+
+        monkeypatch.setattr(server.pipeline, "generate", generate)
+        status, result = post(generate_url, json.dumps({"config": {"a": 1}}).encode())
+        assert status == 200
+        assert result["log"].splitlines() == [
+            "Generating stacks: iam",
+            "Synthesized iam",
+            "Created files: README.md",
+        ]
+
+
+class TestRecycle:
+
+    def test_recycle_reason(self, monkeypatch):
+        monkeypatch.setattr(server, "MAX_REQUESTS", 3)
+        monkeypatch.setattr(server, "MAX_RSS_MB", 100)
+        rss_mb = [50]
+        monkeypatch.setattr(server, "process_rss_mb", lambda: rss_mb[0])
+        assert server.recycle_reason(2) is None
+        assert server.recycle_reason(3) == "request limit 3 reached"
+        rss_mb[0] = 150
+        assert server.recycle_reason(1) == "150MB resident"
+        monkeypatch.setattr(server, "MAX_RSS_MB", 0)
+        assert server.recycle_reason(1) is None
+
+    def test_serve_until_recycle(self, monkeypatch):
+        monkeypatch.setattr(server, "MAX_REQUESTS", 2)
+        monkeypatch.setattr(server, "MAX_RSS_MB", 0)
+        monkeypatch.setattr(server.pipeline, "generate", lambda *args: {})
+        listener = socket.create_server(("127.0.0.1", 0))
+        # the replacing process serves on the socket of the replaced one
+        monkeypatch.setattr(server, "LISTEN_FD", str(listener.fileno()))
+        httpd = server.generate_server()
+        url = f"http://127.0.0.1:{listener.getsockname()[1]}"
+        reasons = []
+        thread = threading.Thread(
+            target=lambda: reasons.append(server.serve_until_recycle(httpd))
+        )
+        thread.start()
+
+        with urllib.request.urlopen(url) as response:
+            assert json.loads(response.read()) == {"status": "ok"}
+        assert post(url, json.dumps({"config": {"a": 1}}).encode())[0] == 200
+        assert thread.is_alive()
+        assert post(url, json.dumps({"config": {"a": 1}}).encode())[0] == 200
+        thread.join(timeout=10)
+        httpd.server_close()
+        assert reasons == ["request limit 2 reached"]
@@ -33,21 +33,23 @@ SETUP_VAR_ENV = [
     "setup_roles",
 ]
 
-def create_templated_file(repo_folder, template_list, vars):
-    uniq_dest_file = set()
+def create_templated_file(repo_folder, template_list, vars, report=True):
+    "writes templated files, returns their names, printed when report is set"
+    uniq_dest_file = {}
     for templ_key in template_list:
         for dest_file_name, template_file in REPO_TEMPLATE_FILE.get(templ_key, []):
-            uniq_dest_file.add(dest_file_name)
+            uniq_dest_file[dest_file_name] = None
             dest_file = os.path.join(repo_folder, os.path.basename(dest_file_name))
             util.write_or_append_file(template_file, dest_file, vars)
-    if uniq_dest_file:
+    if uniq_dest_file and report:
         print(
             f"Created files: {','.join(uniq_dest_file)} in {'/'.join(repo_folder.split('/')[-2:])}"
         )
+    return list(uniq_dest_file)
 
 
-def setup_script(repo_folder, vars, is_tf):
-    "add scripts file and env var in repo folder"
+def setup_script(repo_folder, vars, is_tf, report=True):
+    "add scripts file and env var in repo folder, returns created file names"
     script_var = {}
 
     for var in set(SETUP_VAR_ENV).intersection(vars):
@@ -80,4 +82,6 @@ def setup_script(repo_folder, vars, is_tf):
     env_str = util.python_to_bash_vars(env_li, export=True)
 
     util.write_file_any(f"{repo_folder}/script_env", env_str)
-    create_templated_file(repo_folder, ["_setup_script"], script_var)
+    return ["script_env"] + create_templated_file(
+        repo_folder, ["_setup_script"], script_var, report
+    )
@@ -12,28 +12,57 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import io
+import base64
 import random
 import string
 import os
 import re
-from datetime import datetime
+import heapq
+import hashlib
+import functools
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
 import yaml
 import json
 import shlex
 import shutil
+import filecmp
 import urllib.parse
 import google.auth
 import google.auth.credentials
+import google.auth.exceptions
 import google.oauth2.credentials
 import google.auth.transport.requests
 from google.cloud import storage
 from google.cloud.storage import transfer_manager
-from git import Repo
+import google_crc32c
+from git import Repo, Commit, PushInfo, GitCommandError
 import requests
+import requests.adapters
+import requests.auth
 import jinja2
 
 RANDOM_WORD = "gcp-cdk-tf-id_"
 TF_SINGLE_OUT = "cdktf.out/stacks/{stack_name}/cdk.tf"
+GCS_POOL_SIZE = int(os.environ.get("EZTF_GCS_POOL_SIZE") or 32)
+GCP_SCOPES = ["https://www.googleapis.com/auth/cloud-platform"]
+TOKEN_REFRESH_MARGIN = timedelta(minutes=5)
+GCS_MANIFEST = ".eztf-manifest.json"
+SSM_CACHE_FILE = (
+    os.environ.get("EZTF_SSM_CACHE") or "../ezytf-gen-data/eztf-ssm-cache.json"
+)
+SSM_CACHE_TTL = int(os.environ.get("EZTF_SSM_CACHE_TTL") or 86400)
+
+ACCESS_TOKEN_FILE = os.environ.get("EZTF_ACCESS_TOKEN_FILE")
+
+_credentials = {}
+_credentials_lock = threading.Lock()
+_storage_clients = {}
+_storage_clients_lock = threading.Lock()
+_ssm_session = None
 
 continent_short_name = {
     "africa": "af",
@@ -48,7 +77,18 @@ continent_short_name = {
 DIR_REGEX = r"(n)orth|(s)outh|(e)ast|(w)est|(c)entral"
 DIR_SUBS = "\\1\\2\\3\\4\\5"
 
-jinja_env = jinja2.Environment()
+# config keys read by a stack for its range, besides the range itself
+STACK_RANGE_PREFIXES = ["router_", "external_vpn_gateway_"]
+STACK_RANGE_DETAILS = ["tf_any_resource", "tf_any_data", "tf_any_module"]
+
+TEMPLATE_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "templates"
+)
+# repo templates compile once per process, bytecode is reused across processes
+jinja_env = jinja2.Environment(
+    loader=jinja2.FileSystemLoader(TEMPLATE_DIR),
+    bytecode_cache=jinja2.FileSystemBytecodeCache(),
+)
 
 
 def cdktf_output(stack_name, output_folder="cdktf.out"):
@@ -150,6 +190,13 @@ def dict_without_prefixes(data_dict, prefix_li, skip_keys=[]):
     return new_dict
 
 
+def dict_without_keys(item, keys):
+    "returns dict without keys, copies only top level references and only if needed"
+    if not isinstance(item, dict) or not any(key in item for key in keys):
+        return item
+    return {key: value for key, value in item.items() if key not in keys}
+
+
 def nested_list_keys_to_camel(data):
     def process_item(item, in_list=False):
         if isinstance(item, dict):
@@ -183,6 +230,45 @@ def eztf_filename(name, extension, default, count=0):
     return filename
 
 
+def stack_ranges(config, stack_name):
+    """returns config ranges read by a stack and eztf details of its ranges"""
+    eztf = config["eztf"]
+    ranges = {}
+    details = {}
+    for rr in eztf["stacks"].get(stack_name, []):
+        for rng in rr:
+            for key in [rng] + [f"{prefix}{rng}" for prefix in STACK_RANGE_PREFIXES]:
+                if key in config:
+                    ranges[key] = config[key]
+            for detail in STACK_RANGE_DETAILS:
+                if rng in eztf.get(detail, {}):
+                    details.setdefault(detail, {})[rng] = eztf[detail][rng]
+    return ranges, details
+
+
+def data_hash(data):
+    "returns sha256 hex digest of json serializable data"
+    content = json.dumps(data, sort_keys=True, default=str)
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def files_hash(file_list, root_dir=""):
+    "returns sha256 hex digest of the content of files relative to root_dir"
+    digest = hashlib.sha256()
+    for filename in sorted(file_list):
+        digest.update(filename.encode("utf-8"))
+        with open(os.path.join(root_dir, filename), "rb") as fp:
+            digest.update(fp.read())
+    return digest.hexdigest()
+
+
+def get_file_json(filename):
+    "returns json as dict"
+    with open(filename, "r", encoding="utf-8") as fp:
+        json_dict = json.load(fp)
+    return json_dict
+
+
 def get_file_yaml(filename):
     "returns yaml as dict"
     with open(filename, "r", encoding="utf-8") as fp:
@@ -209,16 +295,37 @@ def write_file_jsonl(filename, data):
     os.makedirs(os.path.dirname(filename), exist_ok=True)
     with open(filename, "w", encoding="utf-8") as fp:
         for item in data:
-            json.dump(item, fp)
+            fp.write(json.dumps(item))
             fp.write("\n")
 
 
+@functools.lru_cache(maxsize=256)
+def compiled_template(content):
+    "returns compiled template of content, cached by content"
+    return jinja_env.from_string(content)
+
+
+@functools.lru_cache(maxsize=64)
+def template_source(filename):
+    "returns content of a template file, cached by path"
+    with open(filename, "r", encoding="utf-8") as fp:
+        return fp.read()
+
+
+def file_template(filename):
+    "returns compiled template of a file, repo templates come from the loader"
+    path = os.path.abspath(filename)
+    if os.path.commonpath([path, TEMPLATE_DIR]) == TEMPLATE_DIR:
+        name = os.path.relpath(path, TEMPLATE_DIR).replace(os.sep, "/")
+        return jinja_env.get_template(name)
+    return compiled_template(template_source(filename))
+
+
 def write_file_any(filename, content, jinja_vars=None, mode="w"):
     "creates any file"
     os.makedirs(os.path.dirname(filename), exist_ok=True)
     if jinja_vars and len(jinja_vars) > 0:
-        template = jinja_env.from_string(content)
-        content = template.render(jinja_vars)
+        content = compiled_template(content).render(jinja_vars)
     with open(filename, mode, encoding="utf-8") as fp:
         fp.write(content)
 
@@ -226,13 +333,37 @@ def write_file_any(filename, content, jinja_vars=None, mode="w"):
 def write_or_append_file(
     source_file, destination_file, jinja_vars=None, force_write=False
 ):
-    with open(source_file, "r", encoding="utf-8") as fp:
-        content = fp.read()
+    if jinja_vars and len(jinja_vars) > 0:
+        content = file_template(source_file).render(jinja_vars)
+    else:
+        content = template_source(source_file)
     mode = "w"
     if os.path.exists(destination_file) and not force_write:
         mode = "a"
         content = "\n\n" + content
-    write_file_any(destination_file, content, jinja_vars, mode)
+    write_file_any(destination_file, content, mode=mode)
+
+
+def ordered_thread_map(func, args_list, max_workers):
+    """runs func for every args tuple in a bounded thread pool,
+    returns results in args_list order, raises first error in that order"""
+    if max_workers <= 1 or len(args_list) <= 1:
+        return [func(*args) for args in args_list]
+
+    def run(args):
+        try:
+            return func(*args), None
+        except Exception as err:
+            return None, err
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        outcomes = list(executor.map(run, args_list))
+    results = []
+    for result, err in outcomes:
+        if err:
+            raise err
+        results.append(result)
+    return results
 
 
 def delete_folders(folder_li):
@@ -240,10 +371,29 @@ def delete_folders(folder_li):
         shutil.rmtree(folder, ignore_errors=True)
 
 
+def storage_client(project=None):
+    """returns process wide storage client, using the shared access token
+    of application default credentials and a pooled http session"""
+    with _storage_clients_lock:
+        if project not in _storage_clients:
+            credentials, default_project = gcp_credentials(user=False)
+            session = requests.Session()
+            session.auth = AccessTokenAuth(user=False)
+            adapter = requests.adapters.HTTPAdapter(
+                pool_connections=GCS_POOL_SIZE, pool_maxsize=GCS_POOL_SIZE
+            )
+            session.mount("https://", adapter)
+            _storage_clients[project] = storage.Client(
+                project=project or default_project,
+                credentials=credentials,
+                _http=session,
+            )
+        return _storage_clients[project]
+
+
 def upload_to_gcs(bucket_name, source_file_name, destination_blob_name):
     """Uploads a file to the bucket."""
-    storage_client = storage.Client()
-    bucket = storage_client.bucket(bucket_name)
+    bucket = storage_client().bucket(bucket_name)
     blob = bucket.blob(destination_blob_name)
 
     blob.upload_from_filename(source_file_name)
@@ -251,16 +401,19 @@ def upload_to_gcs(bucket_name, source_file_name, destination_blob_name):
     print(f"File {source_file_name} uploaded to {destination_blob_name}.")
 
 
-def download_from_gcs(bucket_name, source_blob_name):
-    """Downloads a blob from the bucket."""
-    storage_client = storage.Client()
-    bucket = storage_client.bucket(bucket_name)
+def download_from_gcs(bucket_name, source_blob_name, destination_file_name=None):
+    """Downloads a blob from the bucket in a single request,
+    optionally also writing it to destination_file_name."""
+    bucket = storage_client().bucket(bucket_name)
     blob = bucket.blob(source_blob_name)
-    os.makedirs(os.path.dirname(source_blob_name), exist_ok=True)
-    blob.download_to_filename(source_blob_name)
-    print(f"Blob {source_blob_name} downloaded to {source_blob_name}.")
-    contents = blob.download_as_string().decode("utf-8")
-    return contents
+    contents = blob.download_as_bytes()
+    if destination_file_name:
+        if os.path.dirname(destination_file_name):
+            os.makedirs(os.path.dirname(destination_file_name), exist_ok=True)
+        with open(destination_file_name, "wb") as fp:
+            fp.write(contents)
+        print(f"Blob {source_blob_name} downloaded to {destination_file_name}.")
+    return contents.decode("utf-8")
 
 
 def folder_files(local_folder):
@@ -276,11 +429,91 @@ def folder_files(local_folder):
     return result
 
 
+def sync_folder(source_folder, dest_folder, sub_folders=None):
+    """Moves changed files of source_folder into dest_folder, files are compared
+    by size then content so unchanged files keep their mtime.
+    Removes files no longer produced, hidden files and folders are kept.
+
+    Args:
+        source_folder: folder with freshly generated files, same filesystem.
+        dest_folder: output folder to update.
+        sub_folders: top level folders which were generated, with top level files
+            only these are synced, all when None.
+    """
+    produced = set()
+    written = 0
+    for source_file, folder_file_path in folder_files(source_folder):
+        produced.add(folder_file_path)
+        dest_file = os.path.join(dest_folder, folder_file_path)
+        if os.path.isfile(dest_file) and filecmp.cmp(
+            source_file, dest_file, shallow=False
+        ):
+            continue
+        os.makedirs(os.path.dirname(dest_file), exist_ok=True)
+        os.replace(source_file, dest_file)
+        written += 1
+
+    removed = 0
+    for dest_file, folder_file_path in folder_files(dest_folder):
+        top_folder = folder_file_path.split(os.sep)[0]
+        if folder_file_path in produced or (
+            sub_folders is not None
+            and top_folder != folder_file_path
+            and top_folder not in sub_folders
+        ):
+            continue
+        os.remove(dest_file)
+        removed += 1
+    for path, dirs, files in os.walk(dest_folder, topdown=False):
+        folder_path = os.path.relpath(path, dest_folder)
+        if folder_path == "." or any(
+            part.startswith(".") for part in folder_path.split(os.sep)
+        ):
+            continue
+        if not os.listdir(path):
+            os.rmdir(path)
+    print(
+        f"Synced files in {dest_folder.split('/')[-1]}"
+        f" written:{written} removed:{removed} unchanged:{len(produced) - written}"
+    )
+
+
+def folder_manifest(local_folder, sources=None, previous=None, kept_folders=()):
+    """returns manifest entry of every file in folder with its stack, source
+    range, creator, size and gcs style md5/crc32c hashes
+
+    Args:
+        local_folder: output folder.
+        sources: relative file path to {"range", "creator"} of generated files,
+            other files are from templates.
+        previous: files of previous manifest, reused for kept_folders.
+        kept_folders: top level folders not generated in this run.
+    """
+    sources = sources or {}
+    previous = previous or {}
+    files = {}
+    for local_file, folder_file_path in sorted(folder_files(local_folder)):
+        parts = folder_file_path.split(os.sep)
+        if len(parts) > 1 and parts[0] in kept_folders and folder_file_path in previous:
+            files[folder_file_path] = previous[folder_file_path]
+            continue
+        crc32c, md5_hash = file_checksums(local_file)
+        source = sources.get(folder_file_path, {})
+        files[folder_file_path] = {
+            "stack": parts[0] if len(parts) > 1 else None,
+            "range": source.get("range"),
+            "creator": source.get("creator", "template"),
+            "size": os.path.getsize(local_file),
+            "md5": md5_hash,
+            "crc32c": crc32c,
+        }
+    return files
+
+
 def upload_folder_to_gcs(bucket_name, local_folder, gcs_prefix=""):
     """Uploads a folder to the bucket recursively."""
 
-    storage_client = storage.Client()
-    bucket = storage_client.bucket(bucket_name)
+    bucket = storage_client().bucket(bucket_name)
 
     for local_file, folder_file_path in folder_files(local_folder):
         blob_name = os.path.join(gcs_prefix, folder_file_path)
@@ -288,68 +521,222 @@ def upload_folder_to_gcs(bucket_name, local_folder, gcs_prefix=""):
         blob.upload_from_filename(local_file)
 
 
-def upload_folder_to_gcs_parallel(bucket_name, local_folder, gcs_prefix=""):
-    """Uploads a folder to the bucket parallely."""
-    storage_client = storage.Client()
-    bucket = storage_client.bucket(bucket_name)
+def upload_folder_to_gcs_parallel(
+    bucket_name, local_folder, gcs_prefix="", manifest=None
+):
+    """Uploads a folder to the bucket parallely, files are taken from
+    the folder manifest when provided instead of walking the folder."""
+    bucket = storage_client().bucket(bucket_name)
 
     gcs_prefix = gcs_prefix.rstrip("/") + "/" if gcs_prefix else ""
-    filenames = [folder_file_path for _, folder_file_path in folder_files(local_folder)]
+    if manifest is not None:
+        filenames = list(manifest)
+    else:
+        filenames = [
+            folder_file_path for _, folder_file_path in folder_files(local_folder)
+        ]
 
     results = transfer_manager.upload_many_from_filenames(
         bucket,
         filenames,
         source_directory=local_folder,
         blob_name_prefix=gcs_prefix,
+        max_workers=GCS_POOL_SIZE,
+        worker_type=transfer_manager.THREAD,
     )
     for name, result in zip(filenames, results):
         if isinstance(result, Exception):
-            print("Failed to upload {name} due to exception: {result}")
+            print(f"Failed to upload {name} due to exception: {result}")
     print(
         f"uploaded files in {local_folder.split('/')[-1]} to gs://{bucket_name}/{gcs_prefix}"
     )
 
 
-def _to_hcl_value(value, indent_level=0, indent_spaces=2):
-    """
-    Converts a Python value to its HCL string representation for .tfvars.
-    """
-    current_indent = " " * (indent_level * indent_spaces)
-    next_indent = " " * ((indent_level + 1) * indent_spaces)
+class UploadQueue:
+    """uploads folders to a bucket prefix in background threads, so uploads
+    overlap with generation of the folders queued after them"""
+
+    def __init__(self, bucket_name, gcs_prefix, base_folder):
+        self.bucket_name = bucket_name
+        self.gcs_prefix = gcs_prefix.rstrip("/") + "/" if gcs_prefix else ""
+        self.base_folder = base_folder
+        self.executor = ThreadPoolExecutor(max_workers=GCS_POOL_SIZE)
+        self.futures = {}
+
+    def upload(self, local_file, name):
+        bucket = storage_client().bucket(self.bucket_name)
+        bucket.blob(f"{self.gcs_prefix}{name}").upload_from_filename(local_file)
+
+    def put_folder(self, local_folder):
+        """queues files of a folder, named by their path in base folder,
+        called from stack creator threads"""
+        for local_file, _ in folder_files(local_folder):
+            name = os.path.relpath(local_file, self.base_folder)
+            self.futures[name] = self.executor.submit(self.upload, local_file, name)
+
+    def join(self):
+        "waits for queued uploads, returns names of uploaded files"
+        self.executor.shutdown(wait=True)
+        uploaded = set()
+        for name, future in self.futures.items():
+            if err := future.exception():
+                print(f"Failed to upload {name} due to exception: {err}")
+            else:
+                uploaded.add(name)
+        return uploaded
+
+
+def file_checksums(filename):
+    "returns base64 crc32c and md5 of a file, as in gcs object metadata"
+    crc32c = google_crc32c.Checksum()
+    md5 = hashlib.md5()
+    with open(filename, "rb") as fp:
+        while chunk := fp.read(1024 * 1024):
+            crc32c.update(chunk)
+            md5.update(chunk)
+    return (
+        base64.b64encode(crc32c.digest()).decode("utf-8"),
+        base64.b64encode(md5.digest()).decode("utf-8"),
+    )
+
+
+def blob_matches(blob, crc32c, md5_hash):
+    "compares blob metadata with local checksums, composite objects have no md5"
+    if blob.crc32c:
+        return blob.crc32c == crc32c
+    return blob.md5_hash == md5_hash
+
+
+def sync_folder_to_gcs(bucket_name, local_folder, gcs_prefix="", manifest=None):
+    """Syncs a folder to a stable bucket prefix, uploads only changed files,
+    deletes blobs of removed files and writes a manifest of file hashes.
+    Hashes are taken from the folder manifest when provided."""
+    bucket = storage_client().bucket(bucket_name)
+    gcs_prefix = gcs_prefix.rstrip("/") + "/" if gcs_prefix else ""
+    manifest_name = f"{gcs_prefix}{GCS_MANIFEST}"
+
+    remote_blobs = {
+        blob.name[len(gcs_prefix) :]: blob
+        for blob in bucket.list_blobs(
+            prefix=gcs_prefix, fields="items(name,crc32c,md5Hash),nextPageToken"
+        )
+        if blob.name != manifest_name
+    }
+    if manifest is None:
+        manifest = {}
+        for local_file, folder_file_path in folder_files(local_folder):
+            crc32c, md5_hash = file_checksums(local_file)
+            manifest[folder_file_path] = {
+                "crc32c": crc32c,
+                "md5": md5_hash,
+                "size": os.path.getsize(local_file),
+            }
+    filenames = []
+    for folder_file_path, entry in manifest.items():
+        blob = remote_blobs.pop(folder_file_path, None)
+        if blob is None or not blob_matches(blob, entry["crc32c"], entry["md5"]):
+            filenames.append(folder_file_path)
+
+    if filenames:
+        results = transfer_manager.upload_many_from_filenames(
+            bucket,
+            filenames,
+            source_directory=local_folder,
+            blob_name_prefix=gcs_prefix,
+            max_workers=GCS_POOL_SIZE,
+            worker_type=transfer_manager.THREAD,
+        )
+        for name, result in zip(filenames, results):
+            if isinstance(result, Exception):
+                print(f"Failed to upload {name} due to exception: {result}")
+    if remote_blobs:
+        bucket.delete_blobs(list(remote_blobs.values()))
+    bucket.blob(manifest_name).upload_from_string(
+        json.dumps({"files": manifest}, indent=2, sort_keys=True),
+        content_type="application/json",
+    )
+    print(
+        f"synced files in {local_folder.split('/')[-1]} to gs://{bucket_name}/{gcs_prefix}"
+        f" uploaded:{len(filenames)} deleted:{len(remote_blobs)}"
+        f" unchanged:{len(manifest) - len(filenames)}"
+    )
 
+
+def _hcl_scalar(value):
+    "returns hcl string of a non container value"
     if isinstance(value, str):
-        escaped_value = json.dumps(value)[1:-1]
-        return f'"{escaped_value}"'
+        return json.dumps(value)
     elif isinstance(value, (int, float, bool)):
         return str(value).lower()
     elif value is None:
         return "null"
     elif isinstance(value, (list, tuple)):
-        if not value:
-            return "[]"
-        items_hcl = [
-            f"{next_indent}{_to_hcl_value(item, indent_level + 1, indent_spaces)}"
-            for item in value
-        ]
-        return f"[\n{',\n'.join(items_hcl)},\n{current_indent}]"
+        return "[]"
     elif isinstance(value, dict):
-        if not value:
-            return "{}"
-        pairs_hcl = []
-        for k, v_item in value.items():
-            key_hcl = f'"{k}"' if "-" in str(k) else str(k)
-            val_hcl = _to_hcl_value(v_item, indent_level + 1, indent_spaces)
-            pairs_hcl.append(f"{next_indent}{key_hcl} = {val_hcl}")
-        return f"{{\n{'\n'.join(pairs_hcl)}\n{current_indent}}}"
-    else:
-        escaped_fallback = json.dumps(json.dumps(value)[1:-1])
-        print(
-            f"Warning: Unsupported type {type(value)} for HCL conversion. Representing as an escaped string: {value}"
-        )
-        return escaped_fallback
+        return "{}"
+    escaped_fallback = json.dumps(json.dumps(value)[1:-1])
+    print(
+        f"Warning: Unsupported type {type(value)} for HCL conversion. Representing as an escaped string: {value}"
+    )
+    return escaped_fallback
 
 
-def tf_vars_file(variables, output_folder):
+def write_hcl_value(fp, value, indent_level=0, indent_spaces=2):
+    """
+    Writes a Python value as HCL for .tfvars to a file like object,
+    iterates with an explicit stack so nesting depth is not limited by recursion.
+    """
+    write = fp.write
+    indents = [" " * (i * indent_spaces) for i in range(indent_level + 2)]
+    # stack of (items iterator, is dict, indent of items)
+    stack = []
+    end = object()
+    while True:
+        if isinstance(value, dict) and value:
+            write("{\n")
+            stack.append((iter(value.items()), True, indent_level + 1))
+        elif isinstance(value, (list, tuple)) and value:
+            write("[\n")
+            stack.append((iter(value), False, indent_level + 1))
+        else:
+            write(_hcl_scalar(value))
+            if stack:
+                write("\n" if stack[-1][1] else ",\n")
+
+        while stack:
+            items, is_dict, indent_level = stack[-1]
+            item = next(items, end)
+            if item is not end:
+                break
+            stack.pop()
+            write(indents[indent_level - 1])
+            write("}" if is_dict else "]")
+            if stack:
+                write("\n" if stack[-1][1] else ",\n")
+        else:
+            return
+
+        if indent_level >= len(indents):
+            indents.append(" " * (indent_level * indent_spaces))
+        write(indents[indent_level])
+        if is_dict:
+            key, value = item
+            key = str(key)
+            write(f'"{key}" = ' if "-" in key else f"{key} = ")
+        else:
+            value = item
+
+
+def _to_hcl_value(value, indent_level=0, indent_spaces=2):
+    """
+    Converts a Python value to its HCL string representation for .tfvars.
+    """
+    buffer = io.StringIO()
+    write_hcl_value(buffer, value, indent_level, indent_spaces)
+    return buffer.getvalue()
+
+
+def tf_vars_file(variables, output_folder, tfvars_json=False):
     """
     Creates a tfvars file from a dictionary of variables.
 
@@ -357,59 +744,208 @@ def tf_vars_file(variables, output_folder):
         variables: A dictionary of variables, where the key is the variable name
             and the value is the variable value.
         output_folder: The path to the folder where the tfvars file should be saved.
+        tfvars_json: write terraform.tfvars.json instead of hcl terraform.tfvars.
     """
     os.makedirs(output_folder, exist_ok=True)
+    if tfvars_json:
+        output_file = os.path.join(output_folder, "terraform.tfvars.json")
+        with open(output_file, "w", encoding="utf-8") as f:
+            json.dump(variables, f, indent=2)
+            f.write("\n")
+        return "terraform.tfvars.json"
+
     output_file = os.path.join(output_folder, "terraform.tfvars")
-    tfvars_lines = []
-    for key, value in variables.items():
-        hcl_value_str = _to_hcl_value(value, indent_level=0, indent_spaces=2)
-        tfvars_lines.append(f"{key} = {hcl_value_str}")
+    with open(output_file, "w", encoding="utf-8") as f:
+        for i, (key, value) in enumerate(variables.items()):
+            f.write(f"\n\n{key} = " if i else f"{key} = ")
+            write_hcl_value(f, value, indent_level=0, indent_spaces=2)
+        f.write("\n")
+    return "terraform.tfvars"
+
+
+TF_SPLIT_BLOCK_SIZE = 1024 * 1024
+_tf_file_marker = re.compile(
+    rf"variable[ \t]+\"{RANDOM_WORD}file_([^\"\n]*)\"[ \t]+\{{\s*\}}"
+)
+_tf_open_marker = re.compile(
+    rf"variable[ \t]+\"{RANDOM_WORD}file_[^\"\n]*\"[ \t]+\{{\s*\Z"
+)
+_tf_string_token = re.compile(r'["\\]|[$%]{2}\{|[$%]\{')
+_tf_expression_token = re.compile(r'[{}"]')
+# single "${expr}" or string without templates, else rest of line is tokenized
+_tf_string_literal = re.compile(
+    r'"\$\{(?P<expr>[^"{}\\\n]*)\}"|(?P<plain>"(?:[^"\\\n$%]|[$%](?!\{))*")|"[^\n]*'
+)
+_tf_single_interpolation = re.compile(r'"\$\{([^"{}\\\n]*)\}"')
+# lines with an interpolation literal containing strings or braces, or with a
+# "${expr}" literal following a template or an escaped quote, which it can be
+# nested in, are tokenized. patterns are searched one by one, each starts with
+# a literal which regex finds fast
+_tf_nested_interpolation = [
+    re.compile(r'"\$\{(?![^"{}\\\n]*\}")'),
+    re.compile(r'\$\{(?<!"\$\{)[^\n]*"\$\{'),
+    re.compile(r'%\{[^\n]*"\$\{'),
+    re.compile(r'\\"\$\{'),
+]
+
+
+def _tf_string_end(line, i):
+    "returns index after the string literal starting at line[i]"
+    i += 1
+    while match := _tf_string_token.search(line, i):
+        token, i = match.group(), match.end()
+        if token == '"':
+            return i
+        if token == "\\":
+            i += 1
+        elif len(token) == 2:
+            i = _tf_interpolation_end(line, i)
+    return len(line)
+
+
+def _tf_interpolation_end(line, i):
+    "returns index after the closing brace of interpolation started before line[i]"
+    depth = 1
+    while match := _tf_expression_token.search(line, i):
+        token, i = match.group(), match.end()
+        if token == '"':
+            i = _tf_string_end(line, i - 1)
+        elif token == "{":
+            depth += 1
+        else:
+            depth -= 1
+            if depth == 0:
+                return i
+    return len(line)
+
+
+def _unwrap_literal(match):
+    if match.group("expr") is not None:
+        return match.group("expr")
+    if match.group("plain") is not None:
+        return match.group("plain")
+    line = match.group()
+    parts = []
+    start = 0
+    i = 0
+    while i != -1:
+        end = _tf_string_end(line, i)
+        if line.startswith('"${', i) and _tf_interpolation_end(line, i + 3) == end - 1:
+            parts.append(line[start:i])
+            parts.append(line[i + 3 : end - 2])
+            start = end
+        i = line.find('"', end)
+    parts.append(line[start:])
+    return "".join(parts)
+
+
+def unwrap_interpolations(text):
+    """replaces string literals which are a single interpolation "${expr}"
+    with the bare expression, e.g. "${module.nw.id}" -> module.nw.id.
+    lines with interpolations containing strings or braces, or where a literal
+    may be nested in another string are tokenized, on all other lines literals
+    are replaced by one regex pass"""
+    if '"${' not in text:
+        return text
+    nested_starts = heapq.merge(
+        *(
+            [match.start() for match in pattern.finditer(text)]
+            for pattern in _tf_nested_interpolation
+        )
+    )
+    parts = []
+    start = 0
+    for nested_start in nested_starts:
+        if nested_start < start:
+            continue
+        line_start = text.rfind("\n", start, nested_start) + 1
+        line_end = text.find("\n", nested_start)
+        if line_end == -1:
+            line_end = len(text)
+        parts.append(_tf_single_interpolation.sub(r"\1", text[start:line_start]))
+        parts.append(
+            _tf_string_literal.sub(_unwrap_literal, text[line_start:line_end])
+        )
+        start = line_end
+    parts.append(_tf_single_interpolation.sub(r"\1", text[start:]))
+    return "".join(parts)
 
-    tfvars_content = "\n\n".join(tfvars_lines) + "\n"
 
-    with open(output_file, "w", encoding="utf-8") as f:
-        f.write(tfvars_content)
+def tf_blocks(fp, block_size=TF_SPLIT_BLOCK_SIZE):
+    "yields chunks of about block_size made of whole lines"
+    rest = ""
+    while chunk := fp.read(block_size):
+        chunk = rest + chunk
+        end = chunk.rfind("\n") + 1
+        rest = chunk[end:]
+        if end:
+            yield chunk[:end]
+    if rest:
+        yield rest
 
 
-def split_tf_file(input_file, output_folder):
-    """Splits a .tf file into multiple files based on the variable pattern.
+def split_tf_blocks(blocks, output_folder):
+    """Splits synthesized hcl into multiple files based on the variable pattern,
+    in a single pass writing each file as its blocks are read.
 
     Args:
-        input_file: Path to the input .tf file.
+        blocks: iterable of hcl chunks of a synthesized stack, split at line ends.
         output_folder: Path to the folder where output files will be saved.
     """
 
     os.makedirs(output_folder, exist_ok=True)
-
-    with open(input_file, "r", encoding="utf-8") as f:
-        content = f.read()
-
-    tf_content = re.sub(r"\"\$\{(.+)\}\"", "\\1", content)
-
-    pattern = rf"variable\s+\"{RANDOM_WORD}(file_.*?)\"\s+\{{\s*\}}"
-    tf_list = re.split(pattern, tf_content)
-
-    filename = "backend"
-    i = 0
-    j = 0
     output_files = []
-    while i < len(tf_list):
-        tfdata = tf_list[i]
-        i += 1
-        if match := re.search(r"^file_(\S+)$", tfdata):
-            filename = match.group(1)
-            continue
-        j += 1
-        filename = filename or f"file_{j}"
-        filename = f"{filename}.tf"
-        output_file = os.path.join(output_folder, filename)
+
+    def open_tf_file(name):
+        filename = f"{name or f'file_{len(output_files) + 1}'}.tf"
         output_files.append(filename)
-        with open(output_file, "w", encoding="utf-8") as f:
-            f.write(tfdata)
-        filename = ""
+        return open(os.path.join(output_folder, filename), "w", encoding="utf-8")
+
+    tf_file = open_tf_file("backend")
+    pending = ""
+    try:
+        for block in blocks:
+            text = pending + block
+            pending = ""
+            # separator variable spans lines, keep an unclosed one for next block
+            if RANDOM_WORD in text[-256:] and (
+                match := _tf_open_marker.search(text, max(0, len(text) - 256))
+            ):
+                text, pending = text[: match.start()], text[match.start() :]
+            parts = _tf_file_marker.split(text)
+            tf_file.write(unwrap_interpolations(parts[0]))
+            for name, content in zip(parts[1::2], parts[2::2]):
+                tf_file.close()
+                tf_file = open_tf_file(name)
+                tf_file.write(unwrap_interpolations(content))
+        tf_file.write(unwrap_interpolations(pending))
+    finally:
+        tf_file.close()
     print(
         f"Created files: {','.join(output_files)} in {'/'.join(output_folder.split('/')[-2:])}"
     )
+    return output_files
+
+
+def split_tf_file(input_file, output_folder):
+    """Splits a .tf file into multiple files based on the variable pattern.
+
+    Args:
+        input_file: Path to the input .tf file.
+        output_folder: Path to the folder where output files will be saved.
+    """
+    with open(input_file, "r", encoding="utf-8") as f:
+        return split_tf_blocks(tf_blocks(f), output_folder)
+
+
+def split_tf_content(content, output_folder):
+    """Splits synthesized hcl content into multiple files based on the variable pattern.
+
+    Args:
+        content: hcl content of a synthesized stack.
+        output_folder: Path to the folder where output files will be saved.
+    """
+    return split_tf_blocks(tf_blocks(io.StringIO(content)), output_folder)
 
 
 def ssm_url_extract(url):
@@ -423,41 +959,103 @@ def ssm_url_extract(url):
     return instance_id, project_number, location
 
 
-def ssm_repository(repo_name, ssm_url):
-    """Lists repositories in a Secure Source Manager instance using the requests library."""
+def ssm_session():
+    "returns pooled http session reused for ssm api calls"
+    global _ssm_session
+    if _ssm_session is None:
+        session = requests.Session()
+        session.mount("https://", requests.adapters.HTTPAdapter(pool_maxsize=4))
+        _ssm_session = session
+    return _ssm_session
+
+
+def ssm_cache_get(key):
+    "returns cached git uri of ssm repository if not expired"
+    try:
+        entry = get_file_json(SSM_CACHE_FILE).get(key)
+    except (OSError, ValueError):
+        return None
+    if entry and time.time() - entry.get("time", 0) < SSM_CACHE_TTL:
+        return entry.get("uri")
+    return None
+
+
+def ssm_cache_set(key, uri):
+    "stores git uri of ssm repository, replacing cache file atomically"
+    try:
+        cache = get_file_json(SSM_CACHE_FILE)
+    except (OSError, ValueError):
+        cache = {}
+    now = time.time()
+    cache = {k: v for k, v in cache.items() if now - v.get("time", 0) < SSM_CACHE_TTL}
+    cache[key] = {"uri": uri, "time": now}
+    if os.path.dirname(SSM_CACHE_FILE):
+        os.makedirs(os.path.dirname(SSM_CACHE_FILE), exist_ok=True)
+    tmp_file = f"{SSM_CACHE_FILE}.{os.getpid()}.tmp"
+    with open(tmp_file, "w", encoding="utf-8") as fp:
+        json.dump(cache, fp, indent=2)
+    os.replace(tmp_file, SSM_CACHE_FILE)
+
+
+def ssm_repository(repo_name, ssm_url, api_url=None):
+    """Returns git https uri of a repository in a Secure Source Manager instance,
+    from on disk cache, direct lookup, listing or creating the repository."""
 
     instance_id, project_number, location = ssm_url_extract(ssm_url)
-    access_token = get_access_token()
     repo_uri = f"projects/{project_number}/locations/{location}/repositories"
     base_url = (
-        f"https://{instance_id}-{project_number}-api.{location}.sourcemanager.dev/v1/"
+        api_url
+        or f"https://{instance_id}-{project_number}-api.{location}.sourcemanager.dev/v1/"
     )
     repo_id = f"{repo_uri}/{repo_name}"
+    cache_key = f"{instance_id}-{project_number}.{location}/{repo_name}"
+    if git_uri := ssm_cache_get(cache_key):
+        return git_uri
+
+    session = ssm_session()
+    access_token = get_access_token()
     url = f"{base_url}/{repo_uri}"
     headers = {"Authorization": f"Bearer {access_token}"}
 
-    # list repositories
+    git_uri = None
+    # get repository
+    response = session.get(f"{base_url}{repo_id}", headers=headers, timeout=120)
+    if response.ok:
+        git_uri = response.json()["uris"]["gitHttps"]
+    elif response.status_code != 404:
+        print("get repository failed", response.status_code, response.text)
+        git_uri = ssm_list_repository(session, url, headers, repo_id)
+    if not git_uri:
+        git_uri = ssm_create_repository(session, url, headers, repo_name)
+    if git_uri:
+        ssm_cache_set(cache_key, git_uri)
+    return git_uri
+
+
+def ssm_list_repository(session, url, headers, repo_id):
+    """Lists repositories to find git uri of repo_id"""
     params = {}
     next_page = None
     while True:
         if next_page:
             params = {"page_token": next_page}
-        response = requests.get(url, params=params, headers=headers, timeout=120)
+        response = session.get(url, params=params, headers=headers, timeout=120)
         rep = response.json()
         if not response.ok:
             print("list repositories failed", rep)
             response.raise_for_status()
-        rep = response.json()
         for repo in rep.get("repositories", []):
             if repo.get("name") == repo_id:
                 # print(f"git repo present, skipping creation {repo['uris']['gitHttps']}")
                 return repo["uris"]["gitHttps"]
         next_page = rep.get("nextPageToken")
         if not next_page:
-            break
+            return None
+
 
-    # create repository
-    response = requests.post(
+def ssm_create_repository(session, url, headers, repo_name):
+    """Creates repository, returns its git uri"""
+    response = session.post(
         url, headers=headers, params={"repository_id": repo_name}, data={}, timeout=120
     )
     rep = response.json()
@@ -473,15 +1071,134 @@ def ssm_repository(repo_name, ssm_url):
     return created_repo
 
 
-def push_folder_to_git(repo_path, remote_url, branch_name="main"):
+def next_auto_tag(ls_remote_output):
+    "returns next 0.N-auto tag from ls-remote output lines"
+    r = re.compile(r"refs/tags/0\.(\d+)-auto")
+    max_tag = 0
+    for tagline in ls_remote_output.split("\n"):
+        tagl = tagline.strip().split()
+        if len(tagl) < 2:
+            continue
+        if match := r.match(tagl[1].strip()):
+            curr_tag = int(match.group(1))
+            max_tag = max(curr_tag, max_tag)
+    return f"0.{max_tag + 1}-auto"
+
+
+# push info flags of refs the remote did not update, push does not raise on them
+_PUSH_FAILED = (
+    PushInfo.ERROR
+    | PushInfo.REJECTED
+    | PushInfo.REMOTE_REJECTED
+    | PushInfo.REMOTE_FAILURE
+)
+
+
+def git_cache_repo(cache_dir, remote_url):
+    "returns bare repository cached for remote url, with origin set"
+    key = hashlib.sha256(remote_url.encode("utf-8")).hexdigest()[:16]
+    cache_path = os.path.join(cache_dir, key)
+    if os.path.isdir(cache_path):
+        repo = Repo(cache_path)
+    else:
+        repo = Repo.init(cache_path, bare=True)
+    if "origin" not in repo.remotes:
+        repo.create_remote("origin", remote_url)
+    elif repo.remotes.origin.url != remote_url:
+        repo.remotes.origin.set_url(remote_url)
+    return repo
+
+
+def push_folder_to_git_cached(repo_path, remote_url, branch_name, cache_dir):
+    """Commits folder contents on top of the remote branch using a cached clone,
+    skips commit, tag and push when the tree is unchanged.
+
+    Args:
+        repo_path: Local path to the folder used as work tree.
+        remote_url: The URL of the remote git repository.
+        branch_name: The branch to push to.
+        cache_dir: directory of persistent clones keyed by remote url.
+    """
+    repo = git_cache_repo(cache_dir, remote_url)
+    remote_ref = f"refs/remotes/origin/{branch_name}"
+
+    with repo.git.custom_environment(**git_auth_env(remote_url)):
+        # single round trip for branch head and tags
+        # 0206504b3460ac4e63e28461c525a3708f20a960        refs/heads/auto
+        # 0206504b3460ac4e63e28461c525a3708f20a960        refs/tags/0.1-auto
+        remote_refs = repo.git.ls_remote(
+            "origin", f"refs/heads/{branch_name}", "refs/tags/0.*-auto"
+        ).strip()
+        remote_head = None
+        for line in remote_refs.split("\n"):
+            refl = line.strip().split()
+            if len(refl) == 2 and refl[1] == f"refs/heads/{branch_name}":
+                remote_head = refl[0]
+
+        parents = []
+        if remote_head:
+            local_head = repo.git.rev_parse(
+                "-q", "--verify", remote_ref, with_exceptions=False
+            )
+            if local_head != remote_head:
+                repo.git.fetch(
+                    "--depth=1", "origin", f"+refs/heads/{branch_name}:{remote_ref}"
+                )
+            parents = [repo.commit(remote_head)]
+            repo.git.read_tree(remote_head)
+        else:
+            repo.git.read_tree("--empty")
+
+        work_tree = os.path.abspath(repo_path)
+        with repo.git.custom_environment(GIT_WORK_TREE=work_tree):
+            repo.git.add(all=True, force=True)
+        tree = repo.tree(repo.git.write_tree())
+        if parents and tree == parents[0].tree:
+            print(f"No changes to push to {remote_url} branch {branch_name}")
+            return
+
+        commit = Commit.create_from_tree(repo, tree, "eztf auto commit", parents)
+        tag = next_auto_tag(remote_refs)
+        # tag of a failed push is replaced, refs move only once pushed
+        repo.create_tag(tag, ref=commit, force=True)
+        try:
+            push_infos = repo.remotes.origin.push(
+                refspec=[
+                    f"{commit.hexsha}:refs/heads/{branch_name}",
+                    f"refs/tags/{tag}:refs/tags/{tag}",
+                ],
+                force=True,
+                atomic=True,
+            )
+            push_infos.raise_if_error()
+            failed = [
+                info.summary.strip()
+                for info in push_infos
+                if info.flags & _PUSH_FAILED
+            ]
+            if failed or not push_infos:
+                raise GitCommandError("git push", 1, stderr=", ".join(failed))
+        except GitCommandError:
+            repo.delete_tag(tag)
+            raise
+        repo.git.update_ref(f"refs/heads/{branch_name}", commit.hexsha)
+        repo.git.update_ref(remote_ref, commit.hexsha)
+        print(f"Successfully pushed branch {branch_name} & tag {tag} to {remote_url}")
+
+
+def push_folder_to_git(repo_path, remote_url, branch_name="main", cache_dir=None):
     """Pushes the contents of an existing folder to a Git repository.
 
     Args:
         repo_path: Local path to the folder (already initialized as a Git repository).
         remote_url: The URL of the remote git repository (e.g., "https://github.com/your-username/your-repo.git").
         branch_name: The branch to push to (defaults to "main").
+        cache_dir: directory of persistent clones, when set only changes are pushed.
     """
 
+    if cache_dir:
+        return push_folder_to_git_cached(repo_path, remote_url, branch_name, cache_dir)
+
     repo = Repo.init(repo_path)
 
     if branch_name not in repo.heads:
@@ -498,27 +1215,17 @@ def push_folder_to_git(repo_path, remote_url, branch_name="main"):
         repo.create_remote("origin", remote_url)
 
     origin = repo.remotes.origin
-    r = re.compile(r"refs/tags/0\.(\d+)-auto")
-    max_tag = 0
     # below command returns
     # 0206504b3460ac4e63e28461c525a3708f20a960        refs/tags/0.1-auto
-    rem_tag = repo.git.ls_remote("--tags", "origin", "0.*-auto").strip()
-
-    for tagline in rem_tag.split("\n"):
-        tagl = tagline.strip().split()
-        if len(tagl) < 2:
-            continue
-        if match := r.match(tagl[1].strip()):
-            curr_tag = int(match.group(1))
-            max_tag = max(curr_tag, max_tag)
-    max_tag += 1
-    tag = f"0.{max_tag}-auto"
-    repo.create_tag(tag)
-    origin.push(
-        refspec=[f"{branch_name}:{branch_name}", f"{tag}:{tag}"],
-        force=True,
-        atomic=True,
-    )
+    with repo.git.custom_environment(**git_auth_env(remote_url)):
+        rem_tag = repo.git.ls_remote("--tags", "origin", "0.*-auto").strip()
+        tag = next_auto_tag(rem_tag)
+        repo.create_tag(tag)
+        origin.push(
+            refspec=[f"{branch_name}:{branch_name}", f"{tag}:{tag}"],
+            force=True,
+            atomic=True,
+        )
     print(f"Successfully pushed branch {branch_name} & tag {tag} to {remote_url}")
 
 
@@ -585,7 +1292,7 @@ def python_to_bash_vars(vars, export=False):
 
 
 def generate_command(cmd, options, vars):
-    command = cmd
+    command = list(cmd)
     vars_cmd = ""
     if vars:
         vars_cmd = python_to_bash_vars(vars) + "\n\n"
@@ -689,8 +1396,86 @@ def get_env_token():
     return os.environ.get("EZTF_GCLOUD_ACCESS")
 
 
-def get_access_token():
-    auth_req = google.auth.transport.requests.Request()
-    gcp_token = google.oauth2.credentials.UserAccessTokenCredentials()
-    gcp_token.refresh(request=auth_req)
-    return gcp_token.token
+class TokenCredentials(google.auth.credentials.Credentials):
+    "access token read by read_token, read again on refresh"
+
+    def __init__(self, read_token):
+        super().__init__()
+        self._read_token = read_token
+
+    def refresh(self, request):
+        self.token = self._read_token()
+
+
+def read_token_file(token_file=None):
+    with open(token_file or ACCESS_TOKEN_FILE, encoding="utf-8") as fp:
+        return fp.read().strip()
+
+
+def user_credentials():
+    """returns credentials of the user the generator runs for, token from
+    EZTF_GCLOUD_ACCESS, EZTF_ACCESS_TOKEN_FILE or gcloud, None when unavailable"""
+    if get_env_token():
+        return TokenCredentials(get_env_token)
+    if ACCESS_TOKEN_FILE and os.path.isfile(ACCESS_TOKEN_FILE):
+        return TokenCredentials(read_token_file)
+    credentials = google.oauth2.credentials.UserAccessTokenCredentials()
+    try:
+        credentials.refresh(None)
+    except google.auth.exceptions.UserAccessTokenError:
+        return None
+    return credentials
+
+
+def gcp_credentials(user=True):
+    """returns process wide credentials and default project. ssm and git use
+    user credentials, falling back to application default credentials,
+    storage uses application default credentials"""
+    with _credentials_lock:
+        if user not in _credentials:
+            credentials = user_credentials() if user else None
+            if credentials is not None:
+                _credentials[user] = (credentials, None)
+            else:
+                _credentials[user] = google.auth.default(scopes=GCP_SCOPES)
+        return _credentials[user]
+
+
+def get_access_token(user=True):
+    "returns cached access token, refreshed behind a lock shortly before expiry"
+    credentials, _ = gcp_credentials(user)
+    with _credentials_lock:
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        if not credentials.token or (
+            credentials.expiry and credentials.expiry - now < TOKEN_REFRESH_MARGIN
+        ):
+            credentials.refresh(google.auth.transport.requests.Request())
+            if credentials.expiry is None:
+                # user tokens last an hour but report no expiry
+                credentials.expiry = now + timedelta(minutes=30)
+        return credentials.token
+
+
+class AccessTokenAuth(requests.auth.AuthBase):
+    "adds the shared access token of user or default credentials to requests"
+
+    def __init__(self, user=True):
+        self.user = user
+
+    def __call__(self, r):
+        r.headers["Authorization"] = f"Bearer {get_access_token(self.user)}"
+        return r
+
+
+def git_auth_env(remote_url):
+    """returns git environment passing the user access token to secure source
+    manager remotes, the same identity as the gcloud credential helper.
+    config from environment does not show up in process args"""
+    host = urllib.parse.urlparse(remote_url).hostname or ""
+    if not host.endswith(".sourcemanager.dev"):
+        return {}
+    return {
+        "GIT_CONFIG_COUNT": "1",
+        "GIT_CONFIG_KEY_0": "http.extraHeader",
+        "GIT_CONFIG_VALUE_0": f"Authorization: Bearer {get_access_token()}",
+    }
@@ -0,0 +1,634 @@
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import io
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, HTTPServer
+import pytest
+import google.auth.credentials
+import util
+
+storage = pytest.importorskip("google.cloud.storage")
+
+
+class TestTfVars:
+
+    def test_hcl_value(self):
+        value = {
+            "name": "a\"b",
+            "user-map": {"user-1": "pw", "count": 2, "enabled": True},
+            "subnets": [{"ip": "10.0.0.0/24", "tags": []}, None],
+            "empty": {},
+        }
+        assert util._to_hcl_value(value) == (
+            "{\n"
+            '  name = "a\\"b"\n'
+            '  "user-map" = {\n'
+            '    "user-1" = "pw"\n'
+            "    count = 2\n"
+            "    enabled = true\n"
+            "  }\n"
+            "  subnets = [\n"
+            "    {\n"
+            '      ip = "10.0.0.0/24"\n'
+            "      tags = []\n"
+            "    },\n"
+            "    null,\n"
+            "  ]\n"
+            "  empty = {}\n"
+            "}"
+        )
+
+    def test_hcl_value_deep_nesting(self):
+        depth = sys.getrecursionlimit() + 100
+        value = "leaf"
+        for _ in range(depth):
+            value = [value]
+        hcl = util._to_hcl_value(value)
+        assert hcl.count("[") == depth
+        assert '"leaf"' in hcl
+
+    def test_tf_vars_file(self, tmp_path):
+        variables = {"project_id": "p-1", "labels": {"env": "dev"}}
+        util.tf_vars_file(variables, str(tmp_path))
+        with open(tmp_path / "terraform.tfvars", encoding="utf-8") as f:
+            assert f.read() == (
+                'project_id = "p-1"\n\nlabels = {\n  env = "dev"\n}\n'
+            )
+
+        util.tf_vars_file(variables, str(tmp_path / "json"), tfvars_json=True)
+        assert not os.path.exists(tmp_path / "json" / "terraform.tfvars")
+        with open(tmp_path / "json" / "terraform.tfvars.json", encoding="utf-8") as f:
+            assert json.load(f) == variables
+
+
+class TestSplitTf:
+
+    def marker(self, name):
+        return f'variable "{util.RANDOM_WORD}file_{name}" {{\n\n}}\n'
+
+    def test_unwrap_interpolations(self):
+        # the previous greedy regex turned "${a}-${b}" into a}-${b
+        # and ["${x}", "${y}"] into [x}", "${y]
+        lines = {
+            'id = "${module.nw.id}"': "id = module.nw.id",
+            'ids = ["${x}", "${y}"]': "ids = [x, y]",
+            'name = "${a}-${b}"': 'name = "${a}-${b}"',
+            'a = "${x}" b = "c-${d}" e = "${f}"': 'a = x b = "c-${d}" e = f',
+            'for_each = "${toset(["a", "b"])}"': 'for_each = toset(["a", "b"])',
+            'v = "${f({a = 1})}" w = "${y}"': "v = f({a = 1}) w = y",
+            'v = "${f("${x}")}"': 'v = f("${x}")',
+            'v = "p ${f("${x}")}" w = "${y}"': 'v = "p ${f("${x}")}" w = y',
+            'v = "%{if a}${b}%{endif}" w = "${y}"': 'v = "%{if a}${b}%{endif}" w = y',
+            'v = "say \\"${x}" w = "${y}"': 'v = "say \\"${x}" w = y',
+            'v = "$${x}" w = "${y}"': 'v = "$${x}" w = y',
+            'plain = "value"': 'plain = "value"',
+        }
+        text = "\n".join(lines) + "\n"
+        assert util.unwrap_interpolations(text) == "\n".join(lines.values()) + "\n"
+
+    def test_marker_across_blocks(self, tmp_path):
+        marker = self.marker("sas")
+        cut = marker.index("{") + 2
+        blocks = [
+            'terraform {\n}\nid = "${x}"\n' + marker[:cut],
+            marker[cut:] + 'resource "a" "b" {\n  v = "${y}"\n}\n',
+        ]
+        assert util.split_tf_blocks(blocks, str(tmp_path)) == ["backend.tf", "sas.tf"]
+        assert (tmp_path / "backend.tf").read_text() == "terraform {\n}\nid = x\n"
+        assert (tmp_path / "sas.tf").read_text() == '\nresource "a" "b" {\n  v = y\n}\n'
+
+    def test_pending_window(self, tmp_path):
+        # only the last 256 chars of a block are searched for an open marker
+        content = 'locals {\n  v = "${x}"\n}\n' * 100
+        marker = self.marker("org_iam")
+        blocks = [
+            content + marker[:-3],
+            marker[-3:] + content,
+            self.marker("sas") + content,
+        ]
+        assert util.split_tf_blocks(blocks, str(tmp_path)) == [
+            "backend.tf",
+            "org_iam.tf",
+            "sas.tf",
+        ]
+        unwrapped = content.replace('"${x}"', "x")
+        assert (tmp_path / "backend.tf").read_text() == unwrapped
+        # new line after a separator variable starts the next file
+        assert (tmp_path / "org_iam.tf").read_text() == "\n" + unwrapped
+        assert (tmp_path / "sas.tf").read_text() == "\n" + unwrapped
+
+        content = 'a = "${x}"\n' + self.marker("iam") + 'b = "${y}"\n'
+        for block_size in [1, 7, 64, 1024]:
+            output_folder = tmp_path / f"blocks_{block_size}"
+            util.split_tf_blocks(
+                util.tf_blocks(io.StringIO(content), block_size), str(output_folder)
+            )
+            assert (output_folder / "backend.tf").read_text() == "a = x\n"
+            assert (output_folder / "iam.tf").read_text() == "\nb = y\n"
+
+
+class TestGcs:
+
+    def test_download_from_gcs(self, monkeypatch, tmp_path):
+        from google.auth.credentials import AnonymousCredentials
+
+        monkeypatch.setattr(util, "_storage_clients", {})
+        monkeypatch.setattr(util, "_credentials", {})
+        monkeypatch.setattr(
+            util.google.auth, "default", lambda scopes: (AnonymousCredentials(), "p")
+        )
+        downloads = []
+
+        def download_as_bytes(blob):
+            downloads.append((blob.bucket.name, blob.name))
+            return b"eztf: {}\n"
+
+        monkeypatch.setattr(storage.Blob, "download_as_bytes", download_as_bytes)
+        local_file = tmp_path / "config" / "org.yaml"
+
+        assert util.download_from_gcs("b", "config/org.yaml") == "eztf: {}\n"
+        assert util.download_from_gcs("b", "config/org.yaml", str(local_file))
+        assert local_file.read_text() == "eztf: {}\n"
+        assert downloads == [("b", "config/org.yaml")] * 2
+        assert util.storage_client() is util.storage_client()
+
+    def test_sync_folder_to_gcs(self, monkeypatch, tmp_path):
+        bucket = FakeBucket()
+        monkeypatch.setattr(util, "storage_client", lambda: FakeClient(bucket))
+        (tmp_path / "iam").mkdir()
+        (tmp_path / "README.md").write_text("readme")
+        (tmp_path / "iam" / "main.tf").write_text("a")
+        (tmp_path / "iam" / "old.tf").write_text("old")
+
+        util.sync_folder_to_gcs("b", str(tmp_path), "eztf-output/org/latest")
+        assert sorted(bucket.uploads) == ["README.md", "iam/main.tf", "iam/old.tf"]
+
+        bucket.uploads = []
+        (tmp_path / "iam" / "main.tf").write_text("b")
+        (tmp_path / "iam" / "old.tf").unlink()
+        util.sync_folder_to_gcs("b", str(tmp_path), "eztf-output/org/latest/")
+        assert bucket.uploads == ["iam/main.tf"]
+        assert sorted(bucket.blobs) == [
+            "eztf-output/org/latest/.eztf-manifest.json",
+            "eztf-output/org/latest/README.md",
+            "eztf-output/org/latest/iam/main.tf",
+        ]
+        manifest = json.loads(bucket.blobs["eztf-output/org/latest/.eztf-manifest.json"])
+        assert sorted(manifest["files"]) == ["README.md", "iam/main.tf"]
+        assert manifest["files"]["iam/main.tf"]["size"] == 1
+
+    def test_sync_folder_manifest(self, monkeypatch, tmp_path):
+        bucket = FakeBucket()
+        monkeypatch.setattr(util, "storage_client", lambda: FakeClient(bucket))
+        (tmp_path / "iam").mkdir()
+        (tmp_path / "README.md").write_text("readme")
+        (tmp_path / "iam" / "sas.tf").write_text("a")
+        sources = {"iam/sas.tf": {"range": "sas", "creator": "service_account"}}
+
+        files = util.folder_manifest(str(tmp_path), sources)
+        assert files["iam/sas.tf"]["stack"] == "iam"
+        assert files["iam/sas.tf"]["creator"] == "service_account"
+        assert files["README.md"]["creator"] == "template"
+        assert files["README.md"]["stack"] is None
+
+        # entries of stacks not generated in the run are reused
+        (tmp_path / "iam" / "sas.tf").write_text("b")
+        kept = util.folder_manifest(str(tmp_path), {}, files, {"iam"})
+        assert kept["iam/sas.tf"] == files["iam/sas.tf"]
+
+        util.sync_folder_to_gcs("b", str(tmp_path), "eztf-output/org/latest", files)
+        assert sorted(bucket.uploads) == ["README.md", "iam/sas.tf"]
+        manifest = json.loads(bucket.blobs["eztf-output/org/latest/.eztf-manifest.json"])
+        assert manifest["files"] == files
+
+    def test_upload_queue(self, monkeypatch, tmp_path):
+        bucket = FakeBucket()
+        monkeypatch.setattr(util, "storage_client", lambda: FakeClient(bucket))
+        (tmp_path / "iam").mkdir()
+        (tmp_path / "k8s").mkdir()
+        (tmp_path / "iam" / "sas.tf").write_text("a")
+        (tmp_path / "k8s" / "manifests.yaml").write_text("b")
+
+        queue = util.UploadQueue("b", "eztf-output/org/latest", str(tmp_path))
+        queue.put_folder(str(tmp_path / "iam"))
+        queue.put_folder(str(tmp_path / "k8s"))
+        assert queue.join() == {"iam/sas.tf", "k8s/manifests.yaml"}
+        assert sorted(bucket.blobs) == [
+            "eztf-output/org/latest/iam/sas.tf",
+            "eztf-output/org/latest/k8s/manifests.yaml",
+        ]
+
+
+class FakeBlob(storage.Blob):
+
+    def __init__(self, bucket, name):
+        super().__init__(name, bucket)
+
+    def upload_from_filename(self, filename, **kwargs):
+        with open(filename, "rb") as fp:
+            self.upload_from_string(fp.read())
+        self.bucket.uploads.append(self.name.split("/latest/")[-1])
+
+    # transfer_manager uploads through this helper of storage.Blob
+    _handle_filename_and_upload = upload_from_filename
+
+    def upload_from_string(self, data, content_type=None):
+        data = data.encode("utf-8") if isinstance(data, str) else data
+        self.bucket.blobs[self.name] = data
+
+
+class FakeBucket:
+
+    def __init__(self):
+        self.blobs = {}
+        self.uploads = []
+
+    def blob(self, name):
+        return FakeBlob(self, name)
+
+    def list_blobs(self, prefix, fields=None):
+        result = []
+        for name in sorted(self.blobs):
+            if name.startswith(prefix):
+                blob = FakeBlob(self, name)
+                blob.crc32c = util.base64.b64encode(
+                    util.google_crc32c.Checksum(self.blobs[name]).digest()
+                ).decode("utf-8")
+                result.append(blob)
+        return result
+
+    def delete_blobs(self, blobs):
+        for blob in blobs:
+            del self.blobs[blob.name]
+
+
+class FakeClient:
+
+    def __init__(self, bucket):
+        self._bucket = bucket
+
+    def bucket(self, name):
+        return self._bucket
+
+
+class TestGit:
+
+    def test_push_folder_to_git_cached(self, tmp_path):
+        from git import Repo
+
+        remote_path = str(tmp_path / "remote.git")
+        remote = Repo.init(remote_path, bare=True)
+        cache_dir = str(tmp_path / "cache")
+        output = tmp_path / "output"
+        (output / "iam").mkdir(parents=True)
+        (output / "iam" / "main.tf").write_text("a")
+        (output / ".gitignore").write_text("*.tfstate")
+
+        util.push_folder_to_git(str(output), remote_path, "auto", cache_dir)
+        first = remote.commit("auto")
+        assert sorted(b.path for b in first.tree.traverse()) == [
+            ".gitignore",
+            "iam",
+            "iam/main.tf",
+        ]
+        assert [t.name for t in remote.tags] == ["0.1-auto"]
+
+        util.push_folder_to_git(str(output), remote_path, "auto", cache_dir)
+        assert remote.commit("auto") == first
+        assert len(remote.tags) == 1
+
+        (output / "iam" / "main.tf").unlink()
+        (output / "iam" / "sa.tf").write_text("b")
+        util.push_folder_to_git(str(output), remote_path, "auto", cache_dir)
+        second = remote.commit("auto")
+        assert second.parents == (first,)
+        assert "iam/main.tf" not in [b.path for b in second.tree.traverse()]
+        assert sorted(t.name for t in remote.tags) == ["0.1-auto", "0.2-auto"]
+
+        shutil.rmtree(cache_dir)
+        (output / "iam" / "sa.tf").write_text("c")
+        util.push_folder_to_git(str(output), remote_path, "auto", cache_dir)
+        assert remote.commit("auto").parents == (second,)
+
+    def test_rejected_push(self, tmp_path):
+        from git import Repo, GitCommandError
+
+        remote_path = str(tmp_path / "remote.git")
+        remote = Repo.init(remote_path, bare=True)
+        hook = tmp_path / "remote.git" / "hooks" / "pre-receive"
+        hook.write_text("#!/bin/sh\nexit 1\n")
+        hook.chmod(0o755)
+        cache_dir = str(tmp_path / "cache")
+        output = tmp_path / "output"
+        (output / "iam").mkdir(parents=True)
+        (output / "iam" / "main.tf").write_text("a")
+
+        with pytest.raises(GitCommandError):
+            util.push_folder_to_git(str(output), remote_path, "auto", cache_dir)
+        assert not remote.heads and not remote.tags
+        cache = util.git_cache_repo(cache_dir, remote_path)
+        assert not cache.tags and not cache.heads
+        assert not cache.git.rev_parse(
+            "-q", "--verify", "refs/remotes/origin/auto", with_exceptions=False
+        )
+
+        hook.unlink()
+        util.push_folder_to_git(str(output), remote_path, "auto", cache_dir)
+        assert [t.name for t in remote.tags] == ["0.1-auto"]
+        assert remote.commit("auto").parents == ()
+
+
+class FakeCredentials(google.auth.credentials.Credentials):
+
+    def __init__(self, lifetime):
+        super().__init__()
+        self.lifetime = lifetime
+        self.refreshes = 0
+
+    def refresh(self, request):
+        time.sleep(0.01)
+        self.refreshes += 1
+        self.token = f"token-{self.refreshes}"
+        self.expiry = datetime.now(timezone.utc).replace(tzinfo=None) + self.lifetime
+
+
+class TestAccessToken:
+
+    def test_get_access_token(self, monkeypatch):
+        credentials = FakeCredentials(timedelta(hours=1))
+        monkeypatch.setattr(util, "_credentials", {})
+        monkeypatch.setattr(util, "user_credentials", lambda: None)
+        monkeypatch.setattr(
+            util.google.auth, "default", lambda scopes: (credentials, "p")
+        )
+        with ThreadPoolExecutor(8) as executor:
+            tokens = list(executor.map(lambda _: util.get_access_token(), range(16)))
+        assert tokens == ["token-1"] * 16
+        assert credentials.refreshes == 1
+
+        credentials.expiry = datetime.now(timezone.utc).replace(
+            tzinfo=None
+        ) + timedelta(minutes=1)
+        assert util.get_access_token() == "token-2"
+
+    def test_user_credentials_precedence(self, monkeypatch, tmp_path):
+        adc = FakeCredentials(timedelta(hours=1))
+        monkeypatch.setattr(util.google.auth, "default", lambda scopes: (adc, "p"))
+        gcloud_calls = []
+
+        def gcloud_token(account=None):
+            gcloud_calls.append(account)
+            return "gcloud-token"
+
+        monkeypatch.setattr(
+            util.google.oauth2.credentials._cloud_sdk,
+            "get_auth_access_token",
+            gcloud_token,
+        )
+        token_file = tmp_path / "token"
+        token_file.write_text("file-token\n")
+        monkeypatch.setattr(util, "ACCESS_TOKEN_FILE", str(token_file))
+        monkeypatch.setenv("EZTF_GCLOUD_ACCESS", "env-token")
+
+        def tokens():
+            monkeypatch.setattr(util, "_credentials", {})
+            return util.get_access_token(), util.get_access_token(user=False)
+
+        assert tokens() == ("env-token", "token-1")
+        monkeypatch.delenv("EZTF_GCLOUD_ACCESS")
+        assert tokens() == ("file-token", "token-1")
+        token_file.unlink()
+        assert tokens() == ("gcloud-token", "token-1")
+        assert gcloud_calls
+
+        def gcloud_error(account=None):
+            raise util.google.auth.exceptions.UserAccessTokenError("no gcloud")
+
+        monkeypatch.setattr(
+            util.google.oauth2.credentials._cloud_sdk,
+            "get_auth_access_token",
+            gcloud_error,
+        )
+        assert tokens() == ("token-1", "token-1")
+        assert adc.refreshes == 1
+
+    def test_git_auth_env(self, monkeypatch):
+        monkeypatch.setattr(util, "get_access_token", lambda: "token")
+        assert util.git_auth_env("https://github.com/org/repo.git") == {}
+        ssm_env = util.git_auth_env(
+            "https://ssm-1-git.l.sourcemanager.dev/1/l/repo.git"
+        )
+        assert ssm_env["GIT_CONFIG_VALUE_0"] == "Authorization: Bearer token"
+
+
+class SsmHandler(BaseHTTPRequestHandler):
+    repos = {}
+    requests = []
+
+    def send_json(self, status, data):
+        content = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def do_GET(self):
+        self.requests.append(("GET", self.path))
+        name = self.path.removeprefix("/v1/")
+        if name in self.repos:
+            self.send_json(200, self.repos[name])
+        else:
+            self.send_json(404, {"error": {"code": 404}})
+
+    def do_POST(self):
+        self.requests.append(("POST", self.path))
+        repo_name = self.path.split("repository_id=")[-1]
+        repo = {"uris": {"gitHttps": f"https://git.example/{repo_name}.git"}}
+        self.repos[f"projects/1/locations/l/repositories/{repo_name}"] = repo
+        self.send_json(200, {"response": repo})
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestSsm:
+
+    def test_ssm_repository(self, monkeypatch, tmp_path):
+        monkeypatch.setattr(util, "SSM_CACHE_FILE", str(tmp_path / "ssm.json"))
+        monkeypatch.setattr(util, "get_access_token", lambda: "token")
+        server = HTTPServer(("127.0.0.1", 0), SsmHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        api_url = f"http://127.0.0.1:{server.server_port}/v1/"
+        ssm_url = "https://ssm-1.l.sourcemanager.dev"
+        try:
+            git_uri = util.ssm_repository("org", ssm_url, api_url)
+            assert git_uri == "https://git.example/org.git"
+            assert [method for method, _ in SsmHandler.requests] == ["GET", "POST"]
+
+            SsmHandler.requests.clear()
+            assert util.ssm_repository("org", ssm_url, api_url) == git_uri
+            assert SsmHandler.requests == []
+
+            monkeypatch.setattr(util, "SSM_CACHE_TTL", 0)
+            assert util.ssm_repository("org", ssm_url, api_url) == git_uri
+            assert SsmHandler.requests == [
+                ("GET", "/v1/projects/1/locations/l/repositories/org")
+            ]
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+class TestOrderedThreadMap:
+
+    def test_ordered_results(self):
+        stdout = sys.stdout
+
+        def task(i):
+            time.sleep(0.01 * (5 - i))
+            assert sys.stdout is stdout
+            return i * 2
+
+        assert util.ordered_thread_map(task, [(i,) for i in range(5)], 4) == [
+            0,
+            2,
+            4,
+            6,
+            8,
+        ]
+
+    def test_first_error_in_order(self):
+        done = []
+
+        def task(i):
+            time.sleep(0.01 * (3 - i))
+            done.append(i)
+            if i > 0:
+                raise ValueError(f"failed {i}")
+
+        with pytest.raises(ValueError, match="failed 1"):
+            util.ordered_thread_map(task, [(i,) for i in range(3)], 3)
+        assert sorted(done) == [0, 1, 2]
+
+
+class TestTemplates:
+
+    def test_template_compiled_once(self, tmp_path):
+        util.compiled_template.cache_clear()
+        content = "name: {{ name }}\n"
+        for i in range(500):
+            util.write_file_any(str(tmp_path / f"f_{i}.yaml"), content, {"name": i})
+        assert (tmp_path / "f_42.yaml").read_text() == "name: 42"
+        assert util.compiled_template.cache_info().misses == 1
+
+    def test_write_or_append_file(self, tmp_path):
+        readme = str(tmp_path / "README.md")
+        template = os.path.join(util.TEMPLATE_DIR, "root_repo", "order_README.md")
+        util.write_or_append_file(template, readme, {"stack_list": ["iam", "k8s"]})
+        util.write_or_append_file(template, readme, {"stack_list": ["net"]})
+        content = (tmp_path / "README.md").read_text()
+        assert content.count("### Implementation Order:") == 2
+        assert content.index("iam") < content.index("k8s") < content.index("net")
+        assert util.file_template(template) is util.file_template(template)
+
+
+class TestSyncFolder:
+
+    def test_sync_folder(self, tmp_path):
+        source, dest = tmp_path / "staging" / "org", tmp_path / "org"
+        for folder in [source / "iam", source / "k8s", dest / "iam", dest / "net"]:
+            folder.mkdir(parents=True)
+        (dest / ".terraform").mkdir()
+        (dest / ".terraform" / "lock").write_text("keep")
+        (dest / "iam" / "same.tf").write_text("same")
+        os.utime(dest / "iam" / "same.tf", (1, 1))
+        (dest / "iam" / "changed.tf").write_text("old")
+        (dest / "iam" / "stale.tf").write_text("stale")
+        (dest / "net" / "main.tf").write_text("net")
+        (source / "iam" / "same.tf").write_text("same")
+        (source / "iam" / "changed.tf").write_text("new")
+        (source / "k8s" / "a.yaml").write_text("a")
+
+        util.sync_folder(str(source), str(dest), {"iam", "k8s"})
+        assert os.stat(dest / "iam" / "same.tf").st_mtime == 1
+        assert (dest / "iam" / "changed.tf").read_text() == "new"
+        assert not (dest / "iam" / "stale.tf").exists()
+        assert (dest / "k8s" / "a.yaml").read_text() == "a"
+        assert (dest / "net" / "main.tf").exists()
+
+        util.sync_folder(str(source), str(dest))
+        assert not (dest / "net").exists()
+        assert (dest / ".terraform" / "lock").read_text() == "keep"
+
+
+class TestFolderManifest:
+
+    def test_folder_manifest(self, tmp_path):
+        (tmp_path / "iam").mkdir()
+        (tmp_path / "iam" / "sas.tf").write_text("sa")
+        (tmp_path / "README.md").write_text("readme")
+        sources = {os.path.join("iam", "sas.tf"): {"range": "sas", "creator": "sa"}}
+
+        files = util.folder_manifest(str(tmp_path), sources)
+        crc32c, md5_hash = util.file_checksums(str(tmp_path / "iam" / "sas.tf"))
+        readme_crc32c, readme_md5 = util.file_checksums(str(tmp_path / "README.md"))
+        assert files == {
+            "README.md": {
+                "stack": None,
+                "range": None,
+                "creator": "template",
+                "size": 6,
+                "md5": readme_md5,
+                "crc32c": readme_crc32c,
+            },
+            os.path.join("iam", "sas.tf"): {
+                "stack": "iam",
+                "range": "sas",
+                "creator": "sa",
+                "size": 2,
+                "md5": md5_hash,
+                "crc32c": crc32c,
+            },
+        }
+        # gcs style base64 hashes, stable for unchanged content
+        assert md5_hash == "wS4B8qE/9Vh+Hp5K7bgkLQ=="
+        assert util.folder_manifest(str(tmp_path), sources) == files
+
+        (tmp_path / "iam" / "sas.tf").write_text("sa2")
+        changed = util.folder_manifest(str(tmp_path), sources)
+        assert changed[os.path.join("iam", "sas.tf")]["md5"] != md5_hash
+        assert changed["README.md"] == files["README.md"]
+
+    def test_kept_folders(self, tmp_path):
+        for stack in ["iam", "k8s"]:
+            (tmp_path / stack).mkdir()
+            (tmp_path / stack / "main.tf").write_text(stack)
+        previous = {
+            os.path.join(stack, "main.tf"): {"stack": stack, "range": "kept"}
+            for stack in ["iam", "k8s"]
+        }
+        files = util.folder_manifest(str(tmp_path), None, previous, {"iam"})
+        assert files[os.path.join("iam", "main.tf")] == previous[
+            os.path.join("iam", "main.tf")
+        ]
+        assert files[os.path.join("k8s", "main.tf")]["creator"] == "template"
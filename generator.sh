@@ -26,6 +26,5 @@ if [[ "${EZTF_MODE}" != "workflow" ]]; then
 fi
 
 if [[ "${EZTF_MODE}" == "workflow" ]]; then
-    cd generate && cdktf synth --hcl &&
-        python repo.py
+    cd generate && python pipeline.py
 fi
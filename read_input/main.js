@@ -50,6 +50,10 @@ const LOCAL_OUTPUT_DIR =
 
 const EZTF_SUPPORTED_TF_FILE = "../generate/supported_tf.json";
 
+const EZTF_GENERATE_URL = process.env.EZTF_GENERATE_URL || "";
+
+const EZTF_GCS_SYNC = (process.env.EZTF_GCS_SYNC || "").toLowerCase() === "true";
+
 process.env.CI = 1;
 
 const supportedTf = new Set(readJson(EZTF_SUPPORTED_TF_FILE));
@@ -125,8 +129,11 @@ async function getEzytfOutputDetails(repoName, gitUri, outputBucket) {
     repoUrl = repoUrl.replace(/-git(?=\..+\.sourcemanager\.dev)/, "");
   }
   if (outputBucket) {
-    let ezytfTime = getCurrentTimeFormatted();
-    let gcs_prefix = `eztf-output/${repoName}/${repoName}-${ezytfTime}/`;
+    let gcs_prefix = `eztf-output/${repoName}/latest/`;
+    if (!EZTF_GCS_SYNC) {
+      let ezytfTime = getCurrentTimeFormatted();
+      gcs_prefix = `eztf-output/${repoName}/${repoName}-${ezytfTime}/`;
+    }
     output["output_gcs"] = `gs://${outputBucket}/${gcs_prefix}`;
     output["output_gcs_prefix"] = gcs_prefix;
   }
@@ -146,12 +153,7 @@ async function getEzytfConfigDetails(eztfConfig, outputBucket = "") {
   let repoName = `gcp-${customerName}-${configName}`;
   let fileName = `${configName}/${repoName}.yaml`;
   let output = await getEzytfOutputDetails(repoName, gitUri, outputBucket);
-  let isTfstack = true;
-  if (supportedTf.size > 0) {
-    isTfstack = eztfConfig["eztf"]["tf_stacks"].length > 0;
-  }
-
-  return [fileName, repoName, output, isTfstack];
+  return [fileName, repoName, output];
 }
 
 function writeEztfConfig(eztfConfig, configBucket, fileName) {
@@ -170,19 +172,63 @@ function writeEztfConfig(eztfConfig, configBucket, fileName) {
   return eztfInputConfig;
 }
 
+async function generateTFService(
+  eztfInputConfigFile,
+  configBucket = "",
+  outputBucket = "",
+  outputGcsPrefix = "",
+  asyncGenerate = false
+) {
+  console.log(`running code generation with ${EZTF_GENERATE_URL}`);
+
+  const request = fetch(EZTF_GENERATE_URL, {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify({
+      configFile: eztfInputConfigFile,
+      configBucket: configBucket,
+      outputBucket: outputBucket,
+      outputGcsPrefix: outputGcsPrefix,
+      outputDir: LOCAL_OUTPUT_DIR,
+    }),
+  })
+    .then((response) => response.json())
+    .then((result) => {
+      if (result.log) {
+        console.log(`stdout: ${result.log}`);
+      }
+      if (result.error) {
+        console.error(`stderr: ${result.error}`);
+      }
+      return [result.log, result.error];
+    });
+  if (asyncGenerate) {
+    request.catch((error) => console.error(`generate error: ${error}`));
+    return [null, null];
+  }
+  return request;
+}
+
 async function generateTF(
   eztfInputConfigFile,
   customer,
   configBucket = "",
   outputBucket = "",
   outputGcsPrefix = "",
-  asyncGenerate = false,
-  anyTfStack = true
+  asyncGenerate = false
 ) {
+  if (EZTF_GENERATE_URL) {
+    return generateTFService(
+      eztfInputConfigFile,
+      configBucket,
+      outputBucket,
+      outputGcsPrefix,
+      asyncGenerate
+    );
+  }
   console.log("running code generation");
 
   let generateScript = `export EZTF_INPUT_CONFIG=${eztfInputConfigFile} && \
-    export EZTF_IS_TF=${anyTfStack} && \
     export EZTF_CDK_OUTPUT_DIR=${customer} && \
     export EZTF_OUTPUT_DIR=${LOCAL_OUTPUT_DIR} && \
     export EZTF_CONFIG_BUCKET=${configBucket} && \
@@ -190,9 +236,7 @@ async function generateTF(
     export EZTF_OUTPUT_GCS_PREFIX=${outputGcsPrefix} && \
     if [ -f "\${EZTF_ACCESS_TOKEN_FILE}" ]; then gcloud config set auth/access_token_file $EZTF_ACCESS_TOKEN_FILE 2>/dev/null ; fi && \
     cd ../generate && \
-    
-    if [ "\${EZTF_IS_TF}" = "true" ]; then cdktf synth --hcl --output $EZTF_CDK_OUTPUT_DIR >/dev/null ; fi && \
-    python -W ignore repo.py`;
+    python -W ignore pipeline.py`;
   // console.log(generateScript)
   if (asyncGenerate) {
     runCommand(generateScript);
@@ -228,7 +272,7 @@ async function main(
     eztfConfig = parseConfig(configData, configType);
   }
   eztfConfig["eztf"]["tf_stacks"] = supportedTfstacks(eztfConfig["eztf"]["stacks"], supportedTf);
-  let [fileName, repoName, outputDetails, isTfstack] =
+  let [fileName, repoName, outputDetails] =
     await getEzytfConfigDetails(eztfConfig, outputBucket);
   
   eztfInputConfigFile = writeEztfConfig(eztfConfig, configBucket, fileName);
@@ -240,8 +284,7 @@ async function main(
       configBucket,
       outputBucket,
       outputGcsPrefix,
-      asyncGenerate,
-      isTfstack
+      asyncGenerate
     );
     if (eztfout) {
       outputDetails["log"] = eztfout;